@@ -16,13 +16,15 @@ import os
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from blabber.cache import VoiceProfileCache, PrefixCache
-from blabber.pool import TTSRequestHandlerPool
+from blabber.cache import AudioCache, VoiceProfileCache, PrefixCache
+from blabber.diskcache import DiskAudioCache
+from blabber.pool import AsyncTTSRequestHandlerPool, TTSRequestHandlerPool
+from blabber.services import close_pools
 
 load_dotenv()
 
 
-def _prefix_callable(bot, message):
+async def _prefix_callable(bot, message):
     """
     Determines whether a user message is a command by checking if it has a
     specified prefix or @mention
@@ -34,7 +36,22 @@ def _prefix_callable(bot, message):
     returns:
         callable:
     """
-    return commands.when_mentioned_or(bot.prefixes[message.guild])(bot, message)
+    prefix = await bot.prefixes.fetch_guild(message.guild)
+    return commands.when_mentioned_or(prefix)(bot, message)
+
+
+class BlabberBot(commands.Bot):
+    """
+    Discord bot which shuts down its TTS request handler pool while the
+    event loop is still running, so event loop bound resources such as HTTP
+    sessions are released.
+    """
+    async def close(self):
+        """Disconnects from Discord, then shuts down handler pool."""
+        try:
+            await super().close()
+        finally:
+            await self.pool.close()
 
 
 def load_cog_files(bot):
@@ -64,15 +81,41 @@ if __name__ == "__main__":
         '%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
     logger.addHandler(handler)
 
-    pool = TTSRequestHandlerPool()
+    # Persist synthesized audio across restarts if a directory is provided
+    disk = None
+    if os.getenv('audio_cache_dir'):
+        disk = DiskAudioCache(os.getenv('audio_cache_dir'))
+    audio_cache = AudioCache(disk=disk)
+
+    # Select TTS request processing engine
+    if os.getenv('tts_engine', 'thread') == 'async':
+        pool = AsyncTTSRequestHandlerPool(cache=audio_cache)
+    else:
+        pool = TTSRequestHandlerPool(cache=audio_cache)
+
+    # Batch voice profile and prefix updates to the database, keeping
+    # frequent speakers cached through bursts of one-off users
+    voice_profiles = VoiceProfileCache(write_behind=True, policy='tinylfu')
+    prefixes = PrefixCache(write_behind=True)
     try:
-        bot = commands.Bot(command_prefix=_prefix_callable, help_command=None)
+        bot = BlabberBot(command_prefix=_prefix_callable, help_command=None)
 
         bot.pool = pool
-        bot.voice_profiles = VoiceProfileCache()
-        bot.prefixes = PrefixCache()
+        bot.voice_profiles = voice_profiles
+        bot.prefixes = prefixes
 
         load_cog_files(bot)
         bot.run(os.getenv('discord_token'))
     finally:
-        pool.teardown()
+        # Write pending updates before exiting, releasing every resource even
+        # if releasing another one fails
+        releases = [pool.teardown, voice_profiles.close, prefixes.close,
+                    close_pools]
+        if disk is not None:
+            releases.append(disk.close)
+
+        for release in releases:
+            try:
+                release()
+            except Exception as exception:
+                print(f"{release.__qualname__} failed:\n{exception}")
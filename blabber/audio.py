@@ -8,22 +8,74 @@
 # Python Version: 3.8.1
 # License: MIT License
 
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from discord.oggparse import OggError
 from discord.player import AudioSource
 
 from blabber.request import TTSRequestDispatcher
+from blabber.stream import MAX_BUFFERED
+
+log = logging.getLogger(__name__)
+
+# Number of Opus packets prefetched ahead of playback, 20ms each
+JITTER_BUFFER_SIZE = 10
+
+# Opus frame played in place of a packet not yet prefetched
+SILENCE_FRAME = b'\xf8\xff\xfe'
+
+# Time in secs between reads after which a read is considered late
+LATE_READ_THRESHOLD = 0.04
+
+# Number of silence frames played once idle before the audio player parks
+IDLE_SILENCE_FRAMES = 5
 
 
 class TTSAudio(AudioSource):
     """
     AudioSource object that streams Opus encoded audio data from TTS request
-    responses.
+    responses. A background thread prefetches packets into a small jitter
+    buffer so reads on the audio player thread never block, and waits for
+    more audio between messages until cleared. Once all audio has been
+    played the audio player is paused rather than stopped, without clearing
+    the speaking state, and it resumes as soon as another TTS request is
+    submitted.
 
     parameters:
         pool [TTSRequestHandlerPool]: handler pool for processing a TTS request
+        voice_client    [VoiceClient]: voice client playing audio source
+        key [object] (default=None): key used to schedule TTS requests fairly
+        max_buffered [int] (default=MAX_BUFFERED): number of unread bytes
+                                                   buffered before response
+                                                   audio writes are held back
+    attributes:
+        underruns  [int]: number of reads served silence while audio was late
+        late_reads [int]: number of reads made late by the audio player
     """
-    def __init__(self, pool):
-        self._dispatch = TTSRequestDispatcher(pool)
-        self._packets = self._dispatch.iter_packets()
+    def __init__(self, pool, voice_client, key=None,
+                 max_buffered=MAX_BUFFERED):
+        self._dispatch = TTSRequestDispatcher(pool, key, max_buffered)
+        self._voice_client = voice_client
+        self._buffer = deque()
+        self._prefetcher = None
+        self._prefetching = False
+        self._generation = 0
+        self._last_read = None
+
+        # Silence frames played since audio ran out and whether the audio
+        # player is parked
+        self._idle_frames = 0
+        self._parked = False
+
+        self.underruns = 0
+        self.late_reads = 0
+
+        # Condition variable for synchronized access between threads
+        self._cond = threading.Condition()
 
     def is_opus(self):
         """
@@ -34,27 +86,154 @@ class TTSAudio(AudioSource):
         """
         return True
 
+    def _start_prefetch(self):
+        """
+        Signals the prefetcher thread that audio was submitted, starting the
+        thread if it is not running. Caller must hold condition variable.
+        """
+        self._prefetching = True
+        self._cond.notify_all()
+
+        if self._prefetcher is None:
+            self._prefetcher = threading.Thread(
+                target=self._prefetch,
+                args=(self._generation,),
+                daemon=True)
+            self._prefetcher.start()
+
+    def _prefetch(self, generation):
+        """
+        Moves packets from TTS request responses into the jitter buffer,
+        waiting for more audio to be submitted whenever none is left, until
+        the buffer is cleared or an unexpected error stops the thread.
+
+        parameters:
+            generation [int]: value of buffer generation when started
+        """
+        def has_room():
+            return (len(self._buffer) < JITTER_BUFFER_SIZE
+                    or self._generation != generation)
+
+        def has_audio():
+            return self._prefetching or self._generation != generation
+
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(has_audio)
+                    if self._generation != generation:
+                        return None
+
+                try:
+                    for packet in self._dispatch.iter_packets():
+                        with self._cond:
+                            self._cond.wait_for(has_room)
+                            if self._generation != generation:
+                                return None
+                            self._buffer.append(packet)
+                except OggError:
+                    # Skip past corrupt response audio
+                    pass
+                except ValueError:
+                    # Output stream was closed by clear
+                    pass
+
+                with self._cond:
+                    # Wait for another submission once all audio was read
+                    if not self._dispatch.has_pending():
+                        self._prefetching = False
+        except Exception:
+            log.exception('TTS audio prefetcher failed')
+        finally:
+            with self._cond:
+                # Let the next submission start another prefetcher thread
+                if self._generation == generation:
+                    self._prefetcher = None
+                    self._prefetching = False
+
     def clear(self):
         """
         Re-initializes internal audio data buffer.
         """
+        with self._cond:
+            # Retire current prefetcher thread
+            self._generation += 1
+            self._prefetcher = None
+            self._prefetching = False
+            self._buffer.clear()
+            self._cond.notify_all()
+
         self._dispatch.clear()
-        self._packets = self._dispatch.iter_packets()
+
+    def cleanup(self):
+        """
+        Releases audio data once the audio player has stopped.
+        """
+        self.clear()
+
+    def _park(self):
+        """
+        Pauses audio player until another TTS request is submitted. Caller
+        must hold condition variable.
+        """
+        self._parked = True
+        self._idle_frames = 0
+        self._last_read = None
+
+        # Keep speaking state set, so it does not flap between messages
+        player = self._voice_client._player
+        if player is not None:
+            player.pause(update_speaking=False)
 
     def read(self):
         """
-        Reads one packet of Opus encoded audio data from TTS request responses.
+        Reads one packet of Opus encoded audio data from the jitter buffer.
+        Silence is read if the next packet has not been prefetched in time or
+        all submitted audio has been read, in which case the audio player is
+        parked shortly after.
 
         returns:
             bytes: single packet of Opus encoded audio data
         """
-        try:
-            data = next(self._packets)
-        except StopIteration:
-            data = b''
-            # Restart packet iterator
-            self._packets = self._dispatch.iter_packets()
-        return bytes(data)
+        now = time.perf_counter()
+        with self._cond:
+            if (self._last_read is not None
+                and now - self._last_read > LATE_READ_THRESHOLD):
+                self.late_reads += 1
+            self._last_read = now
+
+            if self._buffer:
+                self._idle_frames = 0
+                data = self._buffer.popleft()
+                self._cond.notify_all()
+                return data
+
+            # Resume prefetching audio submitted since the prefetcher stopped
+            if not self._prefetching and self._dispatch.has_pending():
+                self._start_prefetch()
+
+            if self._prefetching:
+                self.underruns += 1
+            else:
+                # Trail off with silence before parking audio player
+                self._idle_frames += 1
+                if self._idle_frames >= IDLE_SILENCE_FRAMES:
+                    self._park()
+            return SILENCE_FRAME
+
+    def stats(self):
+        """
+        Retrieves playback statistics of audio source.
+
+        returns:
+            dict: underrun and late read counts and packets buffered
+        """
+        with self._cond:
+            return {
+                'underruns': self.underruns,
+                'late_reads': self.late_reads,
+                'buffered': len(self._buffer),
+            }
 
     async def submit_request(self, request):
         """
@@ -64,3 +243,60 @@ class TTSAudio(AudioSource):
             request [TTSRequest]: TTS request object to be submitted
         """
         await self._dispatch.submit_request(request)
+        self._play()
+
+    async def submit_audio(self, audio):
+        """
+        Submits previously synthesized audio for playback. The packet table
+        is shared, not copied.
+
+        parameters:
+            audio [PacketTable]: Opus packets of audio
+        """
+        self._dispatch.submit_audio(audio)
+        self._play()
+
+    def _play(self):
+        """
+        Prefetches submitted audio and resumes parked audio player.
+        """
+        with self._cond:
+            self._start_prefetch()
+
+            # Resume parked audio player
+            self._idle_frames = 0
+            if self._parked:
+                self._parked = False
+                player = self._voice_client._player
+                if player is not None:
+                    player.resume(update_speaking=False)
+
+
+async def broadcast(pool, request, sources):
+    """
+    Synthesizes a TTS request once and plays it on many audio sources. Every
+    audio source reads the same packet table with its own cursor, which is
+    the one held by the audio cache if the audio was cached.
+
+    parameters:
+        pool [TTSRequestHandlerPool]: handler pool for processing TTS request
+        request         [TTSRequest]: TTS request to be broadcast
+        sources           [iterable]: TTSAudio objects to play audio on
+    returns:
+        PacketTable: Opus packets of audio shared by audio sources
+    """
+    dispatch = TTSRequestDispatcher(pool)
+    await dispatch.submit_request(request)
+
+    # Collect response audio off the event loop
+    loop = asyncio.get_event_loop()
+    audio = await loop.run_in_executor(None, dispatch.read_audio)
+
+    # Share the packet table cached by the handler instead of a copy of it
+    cached = pool.cached_audio(request)
+    if cached is not None:
+        audio = cached
+
+    for source in sources:
+        await source.submit_audio(audio)
+    return audio
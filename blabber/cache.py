@@ -8,64 +8,348 @@
 # Python Version: 3.8.1
 # License: MIT License
 
+import asyncio
 import json
+import sys
+import threading
+import time
 
-from cachetools import TTLCache
+from cachetools import LRUCache, TTLCache
 
-from blabber.services import UserService, GuildService
+from blabber.ogg import PacketTable
+from blabber.services import UserService, GuildService, db_key
+from blabber.sketch import FrequencySketch, IntSet
+from blabber.writebehind import WriteBehindQueue
 
 
-class VoiceProfileCache(TTLCache):
+class DatabaseCache(TTLCache):
+    """
+    TTL cache whose misses are read through from the database. Concurrent
+    asynchronous misses of a key share a single database query. Updates are
+    either written through to the database or, in write-behind mode,
+    coalesced and written in batches.
+
+    Entries are evicted in least recently used order. With the 'tinylfu'
+    policy, a value read from the database is only cached in place of the
+    least recently used entry if its key was accessed more often recently,
+    so bursts of one-off keys do not evict frequently used ones.
+
+    parameters:
+        max_size     [int]: maximum size of cache
+        time_to_live [int]: time in secs before a cache object expires
+        write_behind [bool] (default=False): value of 'True' to batch writes
+        policy        [str] (default='lru'): admission policy, either 'lru'
+                                             or 'tinylfu'
+    raises:
+        ValueError: raised when policy is not supported
+    attributes:
+        suppressed [int]: number of lookups which waited on another lookup's
+                          database query
+        rejected   [int]: number of values not admitted into cache
+    """
+    def __init__(self, max_size, time_to_live, write_behind=False,
+                 policy='lru', **kwargs):
+        super().__init__(maxsize=max_size, ttl=time_to_live, **kwargs)
+        self.suppressed = 0
+        self.rejected = 0
+
+        if policy == 'lru':
+            self._sketch = None
+        elif policy == 'tinylfu':
+            self._sketch = FrequencySketch(max_size)
+        else:
+            raise ValueError(f'unsupported cache policy: {policy}')
+
+        # Database queries in flight keyed by cache key
+        self._loading = dict()
+
+        self._writes = None
+        if write_behind:
+            self._writes = WriteBehindQueue(self._write_many)
+
+    def _load(self, key):
+        """
+        Reads value of a key from the database.
+
+        parameters:
+            key [object]: cache key
+        returns:
+            object: value of key
+        """
+        raise NotImplementedError
+
+    def _write_many(self, batch):
+        """
+        Writes a batch of values to the database.
+
+        parameters:
+            batch [dict]: values keyed by cache key
+        """
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        """
+        Retrieves a value, recording the access for the admission policy.
+
+        parameters:
+            key [object]: cache key
+        returns:
+            object: value of key
+        """
+        if self._sketch is not None:
+            self._sketch.increment(key)
+        return super().__getitem__(key)
+
+    def _admit(self, key):
+        """
+        Decides whether a value read from the database is cached, evicting
+        the least recently used entry if the cache is full.
+
+        parameters:
+            key [object]: cache key of value
+        returns:
+            bool: value of 'True' if value should be cached
+        """
+        if self._sketch is None or key in self:
+            return True
+
+        self.expire()
+        if len(self) < self.maxsize:
+            return True
+
+        # Compare against entry evicted next, the least recently used one
+        victim = next(iter(self._TTLCache__links))
+        if self._sketch.estimate(key) > self._sketch.estimate(victim):
+            return True
+
+        self.rejected += 1
+        return False
+
+    def _store(self, key, value):
+        """
+        Caches a value read from the database if admitted by the admission
+        policy.
+
+        parameters:
+            key   [object]: cache key
+            value [object]: value of key
+        """
+        if self._admit(key):
+            TTLCache.__setitem__(self, key, value)
+
+    async def fetch(self, key):
+        """
+        Retrieves value of a key without blocking the event loop. Checks
+        database in an executor if it does not exist in cache, sharing the
+        query with any other lookup of the key already waiting on one.
+
+        parameters:
+            key [object]: cache key
+        returns:
+            object: value of key
+        """
+        if key in self:
+            return self[key]
+
+        if self._sketch is not None:
+            self._sketch.increment(key)
+
+        future = self._loading.get(key)
+        if future is None:
+            loop = asyncio.get_event_loop()
+            future = loop.run_in_executor(None, self._load, key)
+            self._loading[key] = future
+            future.add_done_callback(lambda _: self._loading.pop(key, None))
+        else:
+            self.suppressed += 1
+
+        # Cancelling one lookup must not cancel the shared query
+        value = await asyncio.shield(future)
+
+        # Keep value set while the database was read, this access was
+        # already recorded
+        if key in self:
+            return TTLCache.__getitem__(self, key)
+        self._store(key, value)
+
+        return value
+
+    def flush(self):
+        """
+        Writes pending updates to the database in write-behind mode.
+        """
+        if self._writes is not None:
+            self._writes.flush()
+
+    def close(self):
+        """
+        Stops write-behind mode after writing pending updates to the database.
+        """
+        if self._writes is not None:
+            self._writes.close()
+
+    def write_stats(self):
+        """
+        Retrieves statistics of batched writes.
+
+        returns:
+            dict: write-behind statistics, or None if writing through
+        """
+        if self._writes is not None:
+            return self._writes.stats()
+        return None
+
+
+class VoiceProfileCache(DatabaseCache):
     """
     Voice Profile Cache object that caches recently used voice profiles and 
-    removes those that are least frequently used when size limit is reached.
+    removes those that are least recently used when size limit is reached.
+    The 'tinylfu' policy keeps frequently used voice profiles cached through
+    bursts of one-off users.
 
     parameters:
         max_size [int]: maximum size of cache
         time_to_live [int]: time in secs before a cache object expires
+        write_behind [bool] (default=False): value of 'True' to batch writes
+        policy [str] (default='lru'): admission policy, 'lru' or 'tinylfu'
+    attributes:
+        filtered [int]: number of lookups answered with the default voice
+                        without a database query
     """
-    def __init__(self, max_size=512, time_to_live=60):
-        super().__init__(maxsize=max_size, ttl=time_to_live)
+    def __init__(self, max_size=512, time_to_live=60, write_behind=False,
+                 policy='lru'):
+        super().__init__(max_size, time_to_live, write_behind, policy)
         self.DEFAULT_VOICE = 'english_14'
+        self.filtered = 0
         self._service = UserService()
 
+        # Database keys of users with any voice profile, used once loaded
+        # from the database
+        self._profiled = IntSet()
+        self._profiled_loaded = False
+
+    @staticmethod
+    def key(user, channel):
+        """
+        Packs IDs of a user and channel into a cache key, so cache entries do
+        not hold on to discord objects.
+
+        parameters:
+            user       [User]: discord User object
+            channel [Channel]: discord Channel object
+        returns:
+            int: cache key of voice profile
+        """
+        return user.id << 64 | channel.id
+
+    @staticmethod
+    def _split(key):
+        """
+        Unpacks IDs of a user and channel from a cache key.
+
+        parameters:
+            key [int]: cache key of voice profile
+        returns:
+            tuple: IDs of discord User and Channel
+        """
+        return key >> 64, key & 0xFFFFFFFFFFFFFFFF
+
     def __setitem__(self, key, value):
         """
         Creates an voice profile in cache or updates an existing item. Then 
         writes through to the database to ensure consistency.
 
         parameters:
-            key [tuple]: tuple of discord User and Channel objects
+            key [int]: packed IDs of discord User and Channel
             value [str]: string representing a specific alias
         """
-        super().__setitem__(key, value)
+        super().__setitem__(key, sys.intern(value))
+
+        # Users are never removed, they may have profiles in other channels
+        if value != self.DEFAULT_VOICE:
+            self._profiled.add(db_key(key >> 64))
 
-        if value == self.DEFAULT_VOICE:
-            self._service.delete(*key)
+        if self._writes is not None:
+            self._writes.put(key, value)
+        elif value == self.DEFAULT_VOICE:
+            self._service.delete(*self._split(key))
         else:
-            self._service.insert(*key, value)
+            self._service.insert(*self._split(key), value)
 
-    def __missing__(self, key):
+    def _write_many(self, batch):
         """
-        Checks database for voice profile if it does not exist in cache.
+        Writes a batch of voice profiles to the database.
+
+        parameters:
+            batch [dict]: voice aliases keyed by packed IDs of discord User
+                          and Channel
+        """
+        inserts = []
+        deletes = []
+        for key, value in batch.items():
+            if value == self.DEFAULT_VOICE:
+                deletes.append(self._split(key))
+            else:
+                inserts.append((*self._split(key), value))
+
+        self._service.write_many(inserts, deletes)
+
+    def _load(self, key):
+        """
+        Reads voice profile from database.
 
         parameter:
-            key [tuple]: tuple of discord User and Channel objects
+            key [int]: packed IDs of discord User and Channel
         returns:
             str: voice alias
         """
-        row = self._service.select(*key)
+        # Voice profile may not have been written yet
+        if self._writes is not None:
+            value = self._writes.get(key)
+            if value is not None:
+                return value
+
+        # Users without any voice profile use the default voice
+        user_id, channel_id = self._split(key)
+        if self._profiled_loaded and db_key(user_id) not in self._profiled:
+            self.filtered += 1
+            return self.DEFAULT_VOICE
+
+        row = self._service.select(user_id, channel_id)
         if row:
-            value = row[0]
-        else:
-            value = self.DEFAULT_VOICE
+            # Share alias strings between entries
+            return sys.intern(row[0])
+        return self.DEFAULT_VOICE
 
-        super().__setitem__(key, value)
+    def __missing__(self, key):
+        """
+        Checks database for voice profile if it does not exist in cache.
+
+        parameter:
+            key [int]: packed IDs of discord User and Channel
+        returns:
+            str: voice alias
+        """
+        value = self._load(key)
+        self._store(key, value)
 
         return value
 
+    async def load_users(self):
+        """
+        Loads users with any voice profile from the database, so lookups of
+        users without one are answered with the default voice without a
+        database query.
+        """
+        loop = asyncio.get_event_loop()
+        users = await loop.run_in_executor(None, self._service.select_users)
+
+        # Keep users whose voice profiles were set while the database was read
+        self._profiled.update(users)
+        self._profiled_loaded = True
 
-class PrefixCache(TTLCache):
+
+class PrefixCache(DatabaseCache):
     """
     Prefix Cache object that caches recently used prefixes and
     removes those that are least recently used when size limit is reached.
@@ -73,43 +357,308 @@ class PrefixCache(TTLCache):
     attributes:
         max_size [int]: maximum size of cache
         time_to_live [int]: time in secs before a cache object expires
+        write_behind [bool] (default=False): value of 'True' to batch writes
+        policy [str] (default='lru'): admission policy, 'lru' or 'tinylfu'
     """
-    def __init__(self, max_size=512, time_to_live=3600):
-        super().__init__(maxsize=max_size, ttl=time_to_live)
+    def __init__(self, max_size=512, time_to_live=3600, write_behind=False,
+                 policy='lru'):
+        # Offset applied to cache timer so warmed up prefixes expire early
+        self._skew = 0
+        super().__init__(
+            max_size, time_to_live, write_behind, policy, timer=self._timer)
         self._service = GuildService()
         self.DEFAULT_PREFIX = '>'
 
+    def _timer(self):
+        """
+        Reads cache timer.
+
+        returns:
+            float: time in secs of a monotonic clock, skewed during warm up
+        """
+        return time.monotonic() + self._skew
+
     def __setitem__(self, key, value):
         """
         Creates an item in cache or updates an existing item. Then writes
         through to the database to ensure consistency.
 
         parameters:
-            key [Guild]: discord Guild object
+            key [int]: ID of discord Guild
             value [str]: string used before commands to invoke blabber bot
         """
-        super().__setitem__(key, value)
+        super().__setitem__(key, sys.intern(value))
 
-        if value == self.DEFAULT_PREFIX:
+        if self._writes is not None:
+            self._writes.put(key, value)
+        elif value == self.DEFAULT_PREFIX:
             self._service.delete(key)
         else:
             self._service.insert(key, value)
 
-    def __missing__(self, key):
+    def _write_many(self, batch):
         """
-        Checks database for guild prefix if it does not exist in cache.
+        Writes a batch of guild prefixes to the database.
+
+        parameters:
+            batch [dict]: prefixes keyed by ID of discord Guild
+        """
+        inserts = []
+        deletes = []
+        for key, value in batch.items():
+            if value == self.DEFAULT_PREFIX:
+                deletes.append(key)
+            else:
+                inserts.append((key, value))
+
+        self._service.write_many(inserts, deletes)
+
+    def _load(self, key):
+        """
+        Reads guild prefix from database.
 
         parameter:
-            key [Guild]: discord Guild object
+            key [int]: ID of discord Guild
         returns:
             str: string used for command prefix
         """
+        # Guild prefix may not have been written yet
+        if self._writes is not None:
+            value = self._writes.get(key)
+            if value is not None:
+                return value
+
         row = self._service.select(key)
         if row:
-            value = row[0]
-        else:
-            value = self.DEFAULT_PREFIX
+            # Share prefix strings between entries
+            return sys.intern(row[0])
+        return self.DEFAULT_PREFIX
 
-        super().__setitem__(key, value)
+    def __missing__(self, key):
+        """
+        Checks database for guild prefix if it does not exist in cache.
+
+        parameter:
+            key [int]: ID of discord Guild
+        returns:
+            str: string used for command prefix
+        """
+        value = self._load(key)
+        self._store(key, value)
 
         return value
+
+    async def fetch_guild(self, guild):
+        """
+        Retrieves command prefix used in a guild without blocking the event
+        loop. Direct messages have no guild and use the default prefix.
+
+        parameter:
+            guild [Guild]: discord Guild, or None for direct messages
+        returns:
+            str: string used for command prefix
+        """
+        if guild is None:
+            return self.DEFAULT_PREFIX
+        return await self.fetch(guild.id)
+
+    def _load_many(self, keys):
+        """
+        Reads prefixes of many guilds from database.
+
+        parameters:
+            keys [list]: IDs of discord Guilds
+        returns:
+            list: strings used for command prefix of each guild
+        """
+        # Guild prefixes may not have been written yet, prefixes set after
+        # this point are cached by the setter itself
+        pending = dict()
+        if self._writes is not None:
+            for key in keys:
+                value = self._writes.get(key)
+                if value is not None:
+                    pending[key] = value
+
+        rows = self._service.select_many(
+            [key for key in keys if key not in pending])
+
+        return [pending.get(key)
+                or sys.intern(rows.get(key, self.DEFAULT_PREFIX))
+                for key in keys]
+
+    async def warm_up(self, keys):
+        """
+        Loads prefixes of many guilds into cache with a few bulk queries.
+        Expiry times are spread evenly across the second half of the time to
+        live so warmed up prefixes do not expire at once.
+
+        parameters:
+            keys [iterable]: IDs of discord Guilds
+        """
+        keys = [key for key in keys if key not in self][:self.maxsize]
+        if not keys:
+            return None
+
+        loop = asyncio.get_event_loop()
+        values = await loop.run_in_executor(None, self._load_many, keys)
+
+        # Insert earliest expiring prefixes first to keep expiry order
+        spread = self.ttl / 2
+        try:
+            for index, (key, value) in enumerate(zip(keys, values)):
+                if key in self:
+                    continue
+                self._skew = spread * (index / len(keys) - 1)
+                super().__setitem__(key, value)
+        finally:
+            self._skew = 0
+
+
+class AudioCache(LRUCache):
+    """
+    Audio Cache object that caches synthesized audio of TTS requests as
+    pre-parsed Opus packet tables and removes those that are least recently
+    used when the byte budget is reached. Misses are read through from an
+    optional disk tier, which stores synthesized audio across restarts. Safe
+    to access from handler threads.
+
+    parameters:
+        max_size            [int]: maximum number of bytes of audio cached
+        disk [DiskAudioCache] (default=None): persistent cache tier
+    attributes:
+        hits      [int]: number of lookups served from cache
+        disk_hits [int]: number of hits served from the disk tier
+        misses    [int]: number of lookups not found in cache
+        evictions [int]: number of entries removed to fit the byte budget
+    """
+    def __init__(self, max_size=64 * 1024 * 1024, disk=None):
+        super().__init__(maxsize=max_size, getsizeof=self._getsizeof)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk = disk
+
+        # Internal Lock for synchronized access between threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _getsizeof(table):
+        """
+        Measures size of a cached packet table.
+
+        parameters:
+            table [PacketTable]: cached packet table
+        returns:
+            int: size in bytes
+        """
+        return table.nbytes
+
+    def popitem(self):
+        """
+        Removes least recently used audio from cache.
+
+        returns:
+            tuple: TTS request fingerprint and packet table removed
+        """
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def lookup(self, request, disk=True):
+        """
+        Retrieves synthesized audio of a TTS request. A lookup which skips
+        the disk tier does not count a miss, as a full lookup is expected to
+        follow.
+
+        parameters:
+            request [TTSRequest]: TTS request to look up
+            disk [bool] (default=True): value of 'False' to only look up
+                                        audio cached in memory, without
+                                        blocking on disk I/O
+        returns:
+            PacketTable: Opus packets of audio, or None if not cached
+        """
+        fingerprint = request.fingerprint()
+        with self._lock:
+            audio = self.get(fingerprint)
+            if audio is not None:
+                self.hits += 1
+                return audio
+            if not disk:
+                return None
+
+        # Read disk tier without the lock, so memory lookups do not wait on
+        # disk I/O
+        if self._disk is not None:
+            data = self._disk.get(fingerprint)
+            try:
+                if data is not None:
+                    audio = PacketTable.from_buffer(data)
+            except ValueError:
+                # Entry was not stored as a packet table
+                pass
+
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+
+            # Promote audio found in the disk tier
+            self.disk_hits += 1
+            self.hits += 1
+            self._insert(fingerprint, audio)
+            return audio
+
+    def _insert(self, fingerprint, audio):
+        """
+        Caches audio in memory. Caller must hold internal lock.
+
+        parameters:
+            fingerprint [str]: fingerprint of TTS request
+            audio [PacketTable]: Opus packets of audio
+        """
+        try:
+            self[fingerprint] = audio
+        except ValueError:
+            # Audio is larger than byte budget
+            pass
+
+    def store(self, request, audio):
+        """
+        Caches synthesized audio of a TTS request. Audio larger than the byte
+        budget is not cached.
+
+        parameters:
+            request [TTSRequest]: TTS request which produced the audio
+            audio  [PacketTable]: Opus packets of audio
+        """
+        fingerprint = request.fingerprint()
+        with self._lock:
+            self._insert(fingerprint, audio)
+
+        if self._disk is not None:
+            self._disk.put(fingerprint, audio.to_bytes())
+
+    def stats(self):
+        """
+        Retrieves usage statistics of cache.
+
+        returns:
+            dict: hit, miss and eviction counts, entry count, bytes used and
+                  disk tier statistics
+        """
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self),
+                'size': self.currsize,
+            }
+
+        if self._disk is not None:
+            stats['disk'] = self._disk.stats()
+        return stats
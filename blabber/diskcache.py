@@ -0,0 +1,282 @@
+# diskcache.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# Size in bytes at which the active segment file is sealed
+SEGMENT_SIZE = 16 * 1024 * 1024
+
+# File name suffix of segment files
+SEGMENT_SUFFIX = '.seg'
+
+# Record header preceding each entry: key digest, entry length and checksum
+RECORD_HEADER = struct.Struct('<32sII')
+
+
+class DiskAudioCache():
+    """
+    Persistent cache of synthesized audio kept in append-only segment files.
+    An in-memory index maps key digests to (segment, offset, length) and is
+    rebuilt from the segment files on startup. Entries are served as
+    memoryview slices of memory-mapped segments. When the size limit is
+    reached the oldest segment is compacted: entries read since it was
+    written are appended to the active segment and the rest are dropped.
+
+    parameters:
+        path         [str]: directory holding segment files
+        max_size     [int] (default=1GiB): maximum bytes of segment files
+        segment_size [int] (default=SEGMENT_SIZE): size in bytes at which
+                                                   a segment is sealed
+    """
+    def __init__(self, path, max_size=1024 * 1024 * 1024,
+                 segment_size=SEGMENT_SIZE):
+        os.makedirs(path, exist_ok=True)
+
+        self._path = path
+        self._max_size = max_size
+        self._segment_size = segment_size
+
+        # Entry locations keyed by digest
+        self._index = dict()
+
+        # Sizes of and digests stored in each segment, ordered oldest first
+        self._sizes = dict()
+        self._digests = dict()
+
+        # Memory maps of segments and digests read since written
+        self._maps = dict()
+        self._hot = set()
+
+        self._active = None
+        self._active_id = 0
+
+        # Internal Lock for synchronized access between threads
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _segment_path(self, segment):
+        """
+        Builds path of a segment file.
+
+        parameters:
+            segment [int]: segment number
+        returns:
+            str: path of segment file
+        """
+        return os.path.join(self._path, f'{segment:08d}{SEGMENT_SUFFIX}')
+
+    def _digest(self, key):
+        """
+        Computes digest used to index an entry.
+
+        parameters:
+            key [str]: key of entry
+        returns:
+            bytes: SHA-256 digest of key
+        """
+        return hashlib.sha256(key.encode()).digest()
+
+    def _load(self):
+        """Rebuilds index from existing segment files."""
+        segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self._path)
+            if name.endswith(SEGMENT_SUFFIX)
+            and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+        for segment in segments:
+            self._scan(segment)
+
+        # Resume appending to the newest segment
+        if segments:
+            self._active_id = segments[-1]
+        self._open_active()
+
+    def _scan(self, segment):
+        """
+        Indexes every intact record of a segment file. A torn record left by
+        an interrupted write is truncated along with anything following it.
+
+        parameters:
+            segment [int]: segment number
+        """
+        path = self._segment_path(segment)
+        size = os.path.getsize(path)
+        valid = 0
+        digests = self._digests[segment] = []
+
+        if size:
+            with open(path, 'rb') as file, mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while valid + RECORD_HEADER.size <= size:
+                    digest, length, checksum = RECORD_HEADER.unpack_from(
+                        data, valid)
+                    start = valid + RECORD_HEADER.size
+
+                    if (start + length > size
+                        or zlib.crc32(data[start:start + length]) != checksum):
+                        break
+
+                    self._index[digest] = (segment, start, length)
+                    digests.append(digest)
+                    valid = start + length
+
+        if valid < size:
+            with open(path, 'r+b') as file:
+                file.truncate(valid)
+
+        self._sizes[segment] = valid
+
+    def _open_active(self):
+        """Opens active segment file for appending."""
+        self._sizes.setdefault(self._active_id, 0)
+        self._digests.setdefault(self._active_id, [])
+        self._active = open(self._segment_path(self._active_id), 'ab')
+
+    def _rotate(self):
+        """Seals active segment and starts a new one."""
+        self._active.close()
+        self._active_id += 1
+        self._open_active()
+
+    def _map(self, segment, end):
+        """
+        Memory-maps a segment, remapping it if it has grown past the mapped
+        size. Previous maps stay alive while entries served from them are.
+
+        parameters:
+            segment [int]: segment number
+            end     [int]: offset in bytes that must be mapped
+        returns:
+            memoryview: view of memory-mapped segment
+        """
+        data = self._maps.get(segment)
+        if data is None or len(data) < end:
+            with open(self._segment_path(segment), 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = data
+
+        return memoryview(data)
+
+    def _append(self, digest, value):
+        """
+        Appends an entry to the active segment. Caller must hold internal
+        lock.
+
+        parameters:
+            digest [bytes]: digest of entry key
+            value  [bytes]: entry data
+        """
+        if self._sizes[self._active_id] >= self._segment_size:
+            self._rotate()
+
+        offset = self._sizes[self._active_id] + RECORD_HEADER.size
+        self._active.write(RECORD_HEADER.pack(
+            digest, len(value), zlib.crc32(value)))
+        self._active.write(value)
+        self._active.flush()
+
+        self._index[digest] = (self._active_id, offset, len(value))
+        self._digests[self._active_id].append(digest)
+        self._sizes[self._active_id] = offset + len(value)
+
+    def _compact(self, segment):
+        """
+        Removes a segment, carrying entries read since they were written over
+        to the active segment. Caller must hold internal lock.
+
+        parameters:
+            segment [int]: segment number
+        """
+        view = None
+        for digest in self._digests.pop(segment):
+            location = self._index.get(digest)
+            if location is None or location[0] != segment:
+                continue
+
+            del self._index[digest]
+            if digest in self._hot:
+                self._hot.discard(digest)
+
+                _, offset, length = location
+                if view is None:
+                    view = self._map(segment, offset + length)
+                self._append(digest, bytes(view[offset:offset + length]))
+
+        del self._sizes[segment]
+        self._maps.pop(segment, None)
+
+        try:
+            os.remove(self._segment_path(segment))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Compacts oldest segments until size limit is met. Caller must hold
+        internal lock.
+        """
+        while (sum(self._sizes.values()) > self._max_size
+               and len(self._sizes) > 1):
+            self._compact(next(iter(self._sizes)))
+
+    def get(self, key):
+        """
+        Retrieves an entry without copying it out of the segment file.
+
+        parameters:
+            key [str]: key of entry
+        returns:
+            memoryview: entry data, or None if not cached
+        """
+        digest = self._digest(key)
+        with self._lock:
+            location = self._index.get(digest)
+            if location is None:
+                return None
+
+            segment, offset, length = location
+            view = self._map(segment, offset + length)
+            self._hot.add(digest)
+            return view[offset:offset + length]
+
+    def put(self, key, value):
+        """
+        Stores an entry unless it is already cached.
+
+        parameters:
+            key   [str]: key of entry
+            value [bytes]: entry data
+        """
+        digest = self._digest(key)
+        with self._lock:
+            if digest not in self._index:
+                self._append(digest, value)
+                self._evict()
+
+    def stats(self):
+        """
+        Retrieves usage statistics of cache.
+
+        returns:
+            dict: entry count, segment count and bytes used
+        """
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'segments': len(self._sizes),
+                'size': sum(self._sizes.values()),
+            }
+
+    def close(self):
+        """Closes active segment file."""
+        with self._lock:
+            self._active.close()
@@ -0,0 +1,262 @@
+# ogg.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import struct
+from array import array
+
+from discord.oggparse import OggError
+
+# Ogg page header: magic, version, header type, granule position, serial
+# number, page sequence number, checksum and segment count
+PAGE_HEADER = struct.Struct('<4sBBQIIIB')
+
+
+class OggDemuxer():
+    """
+    Incremental Ogg demuxer which extracts packets from Ogg pages fed to it
+    in chunks of any size. Packets are yielded as memoryview slices of the
+    data fed, so only packets continued across pages and pages split across
+    chunks are copied.
+    """
+    def __init__(self):
+        # Page split across chunks and fragments of a packet split across
+        # pages
+        self._pending = None
+        self._partial = []
+
+    @staticmethod
+    def _lacing(data, offset):
+        """
+        Reads segment table of an Ogg page.
+
+        parameters:
+            data [memoryview]: data holding page
+            offset      [int]: offset of page in data
+        raises:
+            OggError: raised when data does not start with an Ogg page
+        returns:
+            bytes: lacing values of page, or None if its header is incomplete
+        """
+        start = offset + PAGE_HEADER.size
+        if len(data) < start:
+            return None
+        if data[offset:offset + 4] != b'OggS':
+            raise OggError('invalid header magic')
+
+        end = start + data[start - 1]
+        if len(data) < end:
+            return None
+        return bytes(data[start:end])
+
+    def _iter_page(self, page, lacing):
+        """
+        Generator used for extracting packets from a complete Ogg page.
+
+        parameters:
+            page [memoryview]: Ogg page
+            lacing    [bytes]: lacing values of page
+        yields:
+            bytes: bytes-like object holding Opus packet
+        """
+        start = PAGE_HEADER.size + len(lacing)
+        length = 0
+        for value in lacing:
+            length += value
+            if value == 255:
+                continue
+
+            packet = page[start:start + length]
+            if self._partial:
+                self._partial.append(packet)
+                packet = b''.join(self._partial)
+                self._partial.clear()
+            yield packet
+
+            start += length
+            length = 0
+
+        # Packet continues on the next page
+        if length:
+            self._partial.append(page[start:start + length])
+
+    def feed(self, data):
+        """
+        Generator used for extracting packets completed by a chunk of Ogg
+        stream data.
+
+        parameters:
+            data [bytes]: bytes-like object holding next chunk of Ogg stream
+        raises:
+            OggError: raised when data is not a valid Ogg stream
+        yields:
+            bytes: bytes-like object holding Opus packet
+        """
+        view = memoryview(data).cast('B')
+        offset = 0
+
+        # Complete page split across chunks
+        if self._pending is not None:
+            pending = self._pending
+            lacing = self._lacing(pending, 0)
+            while lacing is None:
+                # Copy rest of header, then size of page is known
+                size = PAGE_HEADER.size
+                if len(pending) >= size:
+                    size += pending[size - 1]
+                if offset == len(view):
+                    return None
+
+                end = offset + size - len(pending)
+                pending += view[offset:end]
+                offset = min(end, len(view))
+                lacing = self._lacing(pending, 0)
+
+            # Copy only as much as belongs to the page
+            end = offset + PAGE_HEADER.size + len(lacing) + sum(lacing) \
+                - len(pending)
+            pending += view[offset:end]
+            if end > len(view):
+                return None
+            offset = end
+
+            self._pending = None
+            yield from self._iter_page(memoryview(pending), lacing)
+
+        while offset < len(view):
+            lacing = self._lacing(view, offset)
+            if lacing is not None:
+                size = PAGE_HEADER.size + len(lacing) + sum(lacing)
+                if offset + size <= len(view):
+                    yield from self._iter_page(
+                        view[offset:offset + size], lacing)
+                    offset += size
+                    continue
+
+            self._pending = bytearray(view[offset:])
+            break
+
+    def iter_packets(self, stream):
+        """
+        Generator used for extracting packets from a stream of Ogg pages
+        until the stream reaches EOF. A page cut off at EOF is dropped.
+
+        parameters:
+            stream [SimplexReader]: stream providing a 'read1' method
+        yields:
+            bytes: bytes-like object holding Opus packet
+        """
+        while True:
+            data = stream.read1()
+            if not data:
+                break
+            yield from self.feed(data)
+
+
+class PacketTable():
+    """
+    Immutable table of Opus packets stored as one contiguous buffer and an
+    array of packet boundary offsets. Packets are served as memoryview slices
+    of the buffer, so a table can be replayed any number of times without
+    parsing or copying.
+
+    parameters:
+        buffer  [bytes]: concatenated packet data
+        offsets [array]: packet boundary offsets, one more than packet count
+    """
+    # Serialized form: magic, packet count, offsets, packet data
+    MAGIC = b'OPKT'
+    HEADER = struct.Struct('<4sI')
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_packets(cls, packets):
+        """
+        Builds a packet table from a sequence of packets.
+
+        parameters:
+            packets [iterable]: Opus packets
+        returns:
+            PacketTable: table holding packets
+        """
+        buffer = bytearray()
+        offsets = array('I', [0])
+        for packet in packets:
+            buffer += packet
+            offsets.append(len(buffer))
+
+        return cls(bytes(buffer), offsets)
+
+    @classmethod
+    def from_ogg(cls, data):
+        """
+        Builds a packet table from an Ogg Opus file.
+
+        parameters:
+            data [bytes]: Ogg Opus file contents
+        returns:
+            PacketTable: table holding packets of file
+        """
+        return cls.from_packets(OggDemuxer().feed(data))
+
+    @classmethod
+    def from_buffer(cls, data):
+        """
+        Loads a serialized packet table without copying its contents.
+
+        parameters:
+            data [bytes]: serialized packet table
+        raises:
+            ValueError: raised when data is not a serialized packet table
+        returns:
+            PacketTable: table backed by data
+        """
+        view = memoryview(data)
+        if len(view) < cls.HEADER.size:
+            raise ValueError('truncated packet table')
+
+        magic, count = cls.HEADER.unpack_from(view)
+        start = cls.HEADER.size + (count + 1) * array('I').itemsize
+        if magic != cls.MAGIC or len(view) < start:
+            raise ValueError('invalid packet table')
+
+        offsets = view[cls.HEADER.size:start].cast('I')
+        if offsets[-1] != len(view) - start:
+            raise ValueError('invalid packet table')
+
+        return cls(view[start:], offsets)
+
+    def to_bytes(self):
+        """
+        Serializes packet table.
+
+        returns:
+            bytes: serialized packet table
+        """
+        return b''.join((
+            self.HEADER.pack(self.MAGIC, len(self)),
+            bytes(self.offsets),
+            self.buffer))
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by packet data and offsets.
+
+        returns:
+            int: size in bytes
+        """
+        return len(self.buffer) + len(self.offsets) * self.offsets.itemsize
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        view = memoryview(self.buffer)
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield view[offsets[index]:offsets[index + 1]]
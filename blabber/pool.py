@@ -8,23 +8,266 @@
 # Python Version: 3.8.1
 # License: MIT License
 
-import base64
-import json
+import asyncio
+import binascii
+import logging
 import os
+import math
 import queue
 import threading
+import time
+from collections import deque, namedtuple
 
+import aiohttp
 from dotenv import load_dotenv
-from google.auth.transport.requests import AuthorizedSession
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2 import service_account
 
+from blabber.ogg import PacketTable
+from blabber.scheduler import FairJobQueue
+
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# Google Cloud TTS API synthesis endpoint
+TTS_URL = 'https://texttospeech.googleapis.com/v1/text:synthesize'
+
 # Chunk size for response streaming
 CHUNK_SIZE = 1024 * 1024
 
-# Number of handler threads running in handler pool
-HANDLER_COUNT = 100
+# Bounds on number of handler threads running in handler pool
+MIN_HANDLER_COUNT = 4
+MAX_HANDLER_COUNT = 100
+
+# Time in secs an idle handler thread waits for a job before retiring
+HANDLER_IDLE_TIMEOUT = 60
+
+# Time in secs a job is expected to wait in the job queue before the handler
+# pool grows
+TARGET_WAIT_TIME = 0.1
+
+# Smoothing factor of moving averages for wait time and upstream latency
+SMOOTHING_FACTOR = 0.2
+
+# Number of scaling decisions retained by handler pool
+DECISION_HISTORY = 100
+
+# Number of TTS requests processed concurrently by the asyncio handler pool
+REQUEST_LIMIT = 100
+
+
+def _load_credentials():
+    """
+    Loads scoped Google Cloud API service account credentials.
+
+    returns:
+        Credentials: credentials scoped for the Google Cloud platform
+    """
+    credentials = service_account.Credentials.from_service_account_file(
+        os.getenv('google_application_credentials'))
+    return credentials.with_scopes(
+        ['https://www.googleapis.com/auth/cloud-platform'])
+
+
+def _serve_cached(cache, job):
+    """
+    Writes audio cached in memory for a TTS request job straight to its input
+    stream, so cache hits do not wait behind queued jobs.
+
+    parameters:
+        cache           [AudioCache]: cache of synthesized audio, or None
+        job [(TTSRequest, SimplexWriter)]: TTS request job being submitted
+    returns:
+        bool: value of 'True' if job was served from cache
+    """
+    if cache is None:
+        return False
+
+    request, istream = job
+    audio = cache.lookup(request, disk=False)
+    if audio is None:
+        return False
+
+    try:
+        istream.write(audio, block=False)
+    finally:
+        istream.close()
+    return True
+
+
+class AudioContentDecoder():
+    """
+    Incremental decoder which locates the base64 encoded 'audioContent' field
+    of a Google Cloud TTS API response and decodes it as response chunks
+    arrive. Chunks are scanned with bulk searches over memoryview slices, so
+    chunks may be split at any byte boundary.
+    """
+    FIELD = b'"audioContent"'
+
+    # Decoder states
+    _FIND_FIELD = 0
+    _FIND_VALUE = 1
+    _IN_VALUE = 2
+    _DONE = 3
+
+    def __init__(self):
+        self._state = self._FIND_FIELD
+
+        # Trailing bytes of previous chunk which may hold a partial field name
+        self._tail = b''
+
+        # Base64 encoded bytes not yet forming a complete 4-byte quantum
+        self._carry = b''
+
+    def is_done(self):
+        """
+        Query to determine if the end of the audio content has been reached.
+
+        returns:
+            bool: value of 'True' if the closing quote has been read
+        """
+        return self._state == self._DONE
+
+    def _find_field(self, chunk):
+        """
+        Searches for the end of the field name, including occurrences split
+        across the previous and current chunk.
+
+        parameters:
+            chunk [bytes]: chunk of raw response data
+        returns:
+            int: index in chunk following the field name, or -1 if not found
+        """
+        field_len = len(self.FIELD)
+
+        if self._tail:
+            window = self._tail + bytes(chunk[:field_len - 1])
+            index = window.find(self.FIELD)
+            if index >= 0:
+                return index + field_len - len(self._tail)
+
+        index = chunk.find(self.FIELD)
+        if index >= 0:
+            return index + field_len
+
+        # Keep enough bytes to match a field name split across chunks
+        self._tail = (self._tail + bytes(chunk[-(field_len - 1):]))[
+            -(field_len - 1):]
+        return -1
+
+    def decode(self, chunk):
+        """
+        Decodes the portion of the audio content contained in a chunk.
+
+        parameters:
+            chunk [bytes]: chunk of raw response data
+        raises:
+            binascii.Error: raised when audio content is not valid base64
+        returns:
+            bytes: decoded audio data, possibly empty
+        """
+        start = 0
+
+        if self._state == self._FIND_FIELD:
+            start = self._find_field(chunk)
+            if start < 0:
+                return b''
+            self._tail = b''
+            self._state = self._FIND_VALUE
+
+        if self._state == self._FIND_VALUE:
+            # Skip separator up to the opening quote of the value
+            start = chunk.find(b'"', start)
+            if start < 0:
+                return b''
+            start += 1
+            self._state = self._IN_VALUE
+
+        if self._state != self._IN_VALUE:
+            return b''
+
+        stop = chunk.find(b'"', start)
+        if stop < 0:
+            stop = len(chunk)
+        else:
+            self._state = self._DONE
+
+        view = memoryview(chunk)
+        decoded = b''
+
+        # Complete quantum carried over from the previous chunk
+        if self._carry:
+            needed = min(4 - len(self._carry), stop - start)
+            self._carry += bytes(view[start:start + needed])
+            start += needed
+
+            if len(self._carry) < 4 and not self.is_done():
+                return b''
+
+            decoded = binascii.a2b_base64(self._carry)
+            self._carry = b''
+
+        # Decode all complete quanta directly from the chunk
+        limit = start + ((stop - start) // 4) * 4
+        if self.is_done():
+            limit = stop
+        if limit > start:
+            decoded += binascii.a2b_base64(view[start:limit])
+
+        self._carry = bytes(view[limit:stop])
+        return decoded
+
+
+ScalingDecision = namedtuple(
+    'ScalingDecision',
+    ['time', 'action', 'size', 'depth', 'wait_time', 'latency', 'reason'])
+
+
+class InFlightRequests():
+    """
+    Registry of TTS requests currently being processed. Identical requests
+    submitted while one is in flight join it as followers instead of being
+    sent upstream again.
+    """
+    def __init__(self):
+        self._flights = dict()
+
+        # Internal Lock for synchronized access between threads
+        self._lock = threading.Lock()
+
+    def join(self, request, istream):
+        """
+        Registers a TTS request. If an identical request is in flight, the
+        input stream is attached to it as a follower.
+
+        parameters:
+            request   [TTSRequest]: TTS request being submitted
+            istream [SimplexWriter]: input stream to receive response audio
+        returns:
+            bool: value of 'True' if request joined an in-flight request
+        """
+        fingerprint = request.fingerprint()
+        with self._lock:
+            followers = self._flights.get(fingerprint)
+            if followers is None:
+                self._flights[fingerprint] = []
+                return False
+
+            followers.append(istream)
+            return True
+
+    def land(self, request):
+        """
+        Unregisters a processed TTS request.
+
+        parameters:
+            request [TTSRequest]: TTS request which finished processing
+        returns:
+            list: input streams of followers waiting on response audio
+        """
+        with self._lock:
+            return self._flights.pop(request.fingerprint(), [])
 
 
 class TTSRequestHandler(threading.Thread):
@@ -39,102 +282,376 @@ class TTSRequestHandler(threading.Thread):
     def __init__(self, pool):
         super().__init__()
 
+        self._pool = pool
         self._session = pool._session
         self._terminate = pool._terminate
         self._jobs = pool._jobs
+        self._flights = pool._flights
+        self._cache = pool._cache
+        self._busy = False
 
-    def _extract_b64_data(self, data):
+    def _fan_out(self, followers, audio):
         """
-        Generator used for extracting base64 encoded data from a Google Cloud
-        API response.
+        Writes response audio data to followers of a coalesced TTS request.
 
         parameters:
-            data [bytes]: chunk of raw response data
-        yields:
-            int: integer representation of a byte of base64 encoded data
+            followers        [list]: input streams of followers
+            audio [PacketTable]: Opus packets of response audio, or None if
+                                 the request failed
         """
-        quote_count = 0
-        for byte in data:
-            # Count number of times a quote character is read
-            if byte == ord('"'):
-                quote_count += 1
+        for follower in followers:
+            try:
+                if audio is not None:
+                    follower.write(audio, block=False)
+            finally:
+                follower.close()
 
-            # Yield data between 3rd and 4th quote character
-            if byte != ord('"') and quote_count == 3:
-                yield byte
+    def _process(self, request, istream):
+        """
+        Processes a TTS request job and writes response audio data to its
+        input stream.
+
+        parameters:
+            request   [TTSRequest]: TTS request to be processed
+            istream [SimplexWriter]: input stream provided in TTS request job
+        returns:
+            float: time in secs until upstream responded, or None if no
+                   response was received
+        """
+        decoder = AudioContentDecoder()
+        latency = None
+        buffer = bytearray()
+        audio = None
+        try:
+            # Serve previously synthesized audio without a TTS request
+            if self._cache is not None:
+                audio = self._cache.lookup(request)
+                if audio is not None:
+                    istream.write(audio, block=False)
+                    return None
+
+            # Send TTS request through Google Cloud API session
+            response = self._session.post(
+                TTS_URL, data=request.fingerprint(), stream=True)
+            latency = response.elapsed.total_seconds()
+
+            # Verify if request succeded
+            if not response.ok:
+                return latency
+
+            # Iterate through response in chunks for processing
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                data = decoder.decode(chunk)
+
+                # Write decoded chunk to stream
+                if data:
+                    istream.write(data)
+                    buffer += data
+
+                if decoder.is_done():
+                    audio = PacketTable.from_ogg(bytes(buffer))
+                    if self._cache is not None:
+                        self._cache.store(request, audio)
+                    break
+            return latency
+        finally:
+            # Close input stream after processing response
+            istream.close()
+
+            # Deliver audio to identical requests which joined this one
+            self._fan_out(self._flights.land(request), audio)
+
+    def _serve(self):
+        """Processes jobs from job queue until terminated or retired."""
+        idle_since = time.monotonic()
 
-    def run(self):
-        """Running loop for handler thread object."""
         # Keep polling job queue
         while not self._terminate.is_set():
             # Attempt to retrieve a job
             try:
-                job = self._jobs.get(timeout=1)
+                submitted, job = self._jobs.get(timeout=1)
             except queue.Empty:
+                # Retire handler if it has been idle for too long
+                if (time.monotonic() - idle_since > HANDLER_IDLE_TIMEOUT
+                    and self._pool._retire(self)):
+                    return None
                 continue
 
-            request, istream = job
-            extract_b64_data = self._extract_b64_data
+            self._busy = True
+            self._pool._job_started(time.monotonic() - submitted)
+
+            latency = None
             try:
-                # Send TTS request through Google Cloud API session
-                response = self._session.post(
-                    'https://texttospeech.googleapis.com/v1/text:synthesize',
-                    data=json.dumps(request), stream=True)
+                latency = self._process(*job)
+            except Exception:
+                # A failed job must not take the handler thread down with it
+                log.exception('TTS request job failed')
+            finally:
+                self._pool._job_finished(latency)
+                self._busy = False
+                idle_since = time.monotonic()
 
-                # Verify if request succeded
-                if not response.ok:
-                    continue
+    def run(self):
+        """Running loop for handler thread object."""
+        try:
+            self._serve()
+        except BaseException:
+            # Let handler pool replace handler thread
+            self._pool._remove(self, self._busy)
+            raise
 
-                # Iterate through response in chunks for processing
-                b64_encoded_prefix = bytearray()
-                for chunk in response.iter_lines(chunk_size=CHUNK_SIZE):
-                    b64_encoded_chunk = (b64_encoded_prefix
-                                         + bytes(extract_b64_data(chunk)))
 
-                    # Calculate maximum number of bytes to decode
-                    decode_limit = (len(b64_encoded_chunk) // 4) * 4
+class TTSRequestHandlerPool():
+    """
+    Handler pool for processing TTS request jobs. The number of handler
+    threads grows with job queue depth, job wait time and upstream latency,
+    and shrinks as handler threads sit idle.
 
-                    # Save remaining bytes to be prefixed to the next chunk
-                    b64_encoded_prefix = b64_encoded_chunk[decode_limit:]
+    parameters:
+        min_handlers [int] (default=MIN_HANDLER_COUNT): minimum number of
+                                                        handler threads
+        max_handlers [int] (default=MAX_HANDLER_COUNT): maximum number of
+                                                        handler threads
+        cache [AudioCache] (default=None): cache of synthesized audio served
+                                           in place of TTS requests
+    """
+    def __init__(
+            self,
+            min_handlers=MIN_HANDLER_COUNT,
+            max_handlers=MAX_HANDLER_COUNT,
+            cache=None):
+        # Initialize Google Cloud API session
+        self._session = AuthorizedSession(_load_credentials())
+        self._cache = cache
 
-                    # Write decoded chunk to stream
-                    istream.write(base64.b64decode(
-                        b64_encoded_chunk[:decode_limit]))
-            finally:
-                # Close input stream after processing response
-                istream.close()
+        self._terminate = threading.Event()
+        self._jobs = FairJobQueue()
+        self._flights = InFlightRequests()
+        self._handlers = set()
 
+        self._min_handlers = min_handlers
+        self._max_handlers = max(min_handlers, max_handlers)
 
-class TTSRequestHandlerPool():
-    """Handler pool for processing TTS request jobs."""
-    def __init__(self):
-        # Initialize Google Cloud API session
-        credentials = service_account.Credentials.from_service_account_file(
-            os.getenv('google_application_credentials'))
-        scoped_credentials = credentials.with_scopes(
-            ['https://www.googleapis.com/auth/cloud-platform'])
-        self._session = AuthorizedSession(scoped_credentials)
+        # Load statistics used for scaling decisions
+        self._idle = 0
+        self._wait_time = 0.0
+        self._latency = 0.0
+        self._decisions = deque(maxlen=DECISION_HISTORY)
 
-        self._terminate = threading.Event()
-        self._jobs = queue.Queue()
-        self._handlers = [None] * HANDLER_COUNT
+        # Internal Lock for synchronized access between threads
+        self._lock = threading.Lock()
 
-        # Spawn handler threads
-        for index in range(HANDLER_COUNT):
-            self._handlers[index] = TTSRequestHandler(self)
-            self._handlers[index].start()
+        # Spawn minimum number of handler threads
+        with self._lock:
+            for _ in range(self._min_handlers):
+                self._spawn('minimum pool size')
 
     def __del__(self):
         self.teardown()
 
-    def submit_job(self, job):
+    def _record(self, action, reason):
+        """
+        Records a scaling decision. Caller must hold internal lock.
+
+        parameters:
+            action [str]: scaling action performed
+            reason [str]: reason for performing scaling action
+        """
+        self._decisions.append(ScalingDecision(
+            time.time(), action, len(self._handlers), self._jobs.qsize(),
+            self._wait_time, self._latency, reason))
+
+    def _spawn(self, reason):
+        """
+        Spawns a handler thread. Caller must hold internal lock.
+
+        parameters:
+            reason [str]: reason for growing handler pool
+        """
+        handler = TTSRequestHandler(self)
+        self._handlers.add(handler)
+        self._idle += 1
+        handler.start()
+
+        self._record('grow', reason)
+
+    def _retire(self, handler):
         """
-        Submits a TTS request job to a FIFO job queue for processing.
+        Removes an idle handler thread from handler pool if pool is above its
+        minimum size.
+
+        parameters:
+            handler [TTSRequestHandler]: idle handler thread
+        returns:
+            bool: value of 'True' if handler thread should terminate
+        """
+        with self._lock:
+            if len(self._handlers) <= self._min_handlers:
+                return False
+
+            self._handlers.discard(handler)
+            self._idle -= 1
+            self._record('shrink', 'handler idle')
+            return True
+
+    def _remove(self, handler, busy):
+        """
+        Removes a handler thread which exited abnormally from handler pool,
+        replacing it if the pool falls below its minimum size.
+
+        parameters:
+            handler [TTSRequestHandler]: exiting handler thread
+            busy                 [bool]: value of 'True' if handler thread was
+                                         processing a job
+        """
+        with self._lock:
+            if handler not in self._handlers:
+                return None
+
+            self._handlers.discard(handler)
+            if not busy:
+                self._idle -= 1
+            self._record('shrink', 'handler failed')
+
+            if (len(self._handlers) < self._min_handlers
+                    and not self._terminate.is_set()):
+                self._spawn('replace failed handler')
+
+    def _job_started(self, wait_time):
+        """
+        Updates load statistics when a handler thread retrieves a job.
+
+        parameters:
+            wait_time [float]: time in secs job waited in job queue
+        """
+        with self._lock:
+            self._idle -= 1
+            self._wait_time += SMOOTHING_FACTOR * (wait_time - self._wait_time)
+
+    def _job_finished(self, latency):
+        """
+        Updates load statistics when a handler thread finishes a job.
+
+        parameters:
+            latency [float]: time in secs until upstream responded, or None
+                             if no response was received
+        """
+        with self._lock:
+            self._idle += 1
+            if latency is not None:
+                self._latency += SMOOTHING_FACTOR * (latency - self._latency)
+
+    def _scale(self):
+        """Grows handler pool if queued jobs are expected to wait too long."""
+        with self._lock:
+            size = len(self._handlers)
+            if size >= self._max_handlers:
+                return None
+
+            # Jobs which no idle handler thread is available to process
+            backlog = self._jobs.qsize() - self._idle
+            if backlog <= 0:
+                return None
+
+            # Estimate wait time of backlog using upstream latency
+            expected_wait = math.ceil(backlog / max(size, 1)) * self._latency
+
+            if self._wait_time > TARGET_WAIT_TIME:
+                self._spawn('job wait time above target')
+            elif expected_wait > TARGET_WAIT_TIME or not self._latency:
+                self._spawn('expected wait time above target')
+
+    def size(self):
+        """
+        Query to determine number of handler threads in handler pool.
+
+        returns:
+            int: number of running handler threads
+        """
+        with self._lock:
+            return len(self._handlers)
+
+    def stats(self):
+        """
+        Retrieves load statistics of handler pool.
+
+        returns:
+            dict: handler pool size, idle handler count, job queue depth,
+                  average job wait time and average upstream latency
+        """
+        with self._lock:
+            return {
+                'size': len(self._handlers),
+                'idle': self._idle,
+                'depth': self._jobs.qsize(),
+                'wait_time': self._wait_time,
+                'latency': self._latency,
+            }
+
+    def scaling_decisions(self):
+        """
+        Retrieves most recent scaling decisions of handler pool.
+
+        returns:
+            list: ScalingDecision objects ordered from oldest to newest
+        """
+        with self._lock:
+            return list(self._decisions)
+
+    def cached_audio(self, request):
+        """
+        Retrieves synthesized audio of a TTS request cached in memory, so it
+        can be shared instead of copied.
+
+        parameters:
+            request [TTSRequest]: TTS request to look up
+        returns:
+            PacketTable: Opus packets of audio, or None if not cached
+        """
+        if self._cache is None:
+            return None
+        return self._cache.lookup(request, disk=False)
+
+    def queue_stats(self):
+        """
+        Retrieves queueing statistics of each job flow.
+
+        returns:
+            dict: queue depth and average job wait time keyed by flow key
+        """
+        return self._jobs.stats()
+
+    def submit_job(self, job, key=None):
+        """
+        Submits a TTS request job to a fair job queue for processing. Jobs
+        sharing a key are processed in FIFO order, while distinct keys are
+        served round-robin in proportion to message length. Jobs whose audio
+        is cached in memory are served right away, and jobs identical to one
+        in flight receive its audio instead of being queued.
 
         parameters:
             job [(TTSRequest, SimplexWriter)]: TTS request job to be submitted
+            key [object] (default=None): hashable key identifying job flow,
+                                         such as a guild or (guild, user) ID
         """
-        self._jobs.put(job)
+        request, istream = job
+
+        if _serve_cached(self._cache, job):
+            return None
+
+        # Coalesce with an identical request already in flight
+        if self._flights.join(request, istream):
+            return None
+
+        self._jobs.put(job, key, len(request['input']['text']))
+        self._scale()
+
+    async def close(self):
+        """
+        Terminates all active handler threads without blocking the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.teardown)
 
     def teardown(self):
         """Terminates all active handler threads in handler pool."""
@@ -143,6 +660,265 @@ class TTSRequestHandlerPool():
             # Set termination flag
             self._terminate.set()
 
+            with self._lock:
+                handlers = list(self._handlers)
+
             # Join all handler threads
-            for handler in self._handlers:
+            for handler in handlers:
                 handler.join()
+
+
+class AsyncTTSRequestHandlerPool():
+    """
+    Handler pool for processing TTS request jobs as tasks on the running event
+    loop. Concurrency is bounded by a semaphore instead of a fixed number of
+    handler threads. Each task admitted by the semaphore retrieves the next
+    job from a fair job queue.
+
+    parameters:
+        limit [int] (default=REQUEST_LIMIT): maximum number of TTS request
+                                             jobs processed concurrently
+        cache [AudioCache] (default=None): cache of synthesized audio served
+                                           in place of TTS requests
+    """
+    def __init__(self, limit=REQUEST_LIMIT, cache=None):
+        self._credentials = _load_credentials()
+        self._cache = cache
+        self._limit = limit
+        self._terminated = False
+        self._jobs = FairJobQueue()
+        self._flights = InFlightRequests()
+        self._tasks = set()
+
+        # Event loop bound objects are created once the first job arrives
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._refresh_lock = None
+
+    def __del__(self):
+        # Event loop bound objects can no longer be released once it closed
+        if self._loop is None or not self._loop.is_closed():
+            self.teardown()
+
+    def _bind(self):
+        """Binds HTTP session and synchronization objects to the event loop."""
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+            self._session = aiohttp.ClientSession()
+            self._semaphore = asyncio.Semaphore(self._limit)
+            self._refresh_lock = asyncio.Lock()
+
+    async def _authorize(self, headers):
+        """
+        Refreshes API credentials if necessary and applies them to request
+        headers.
+
+        parameters:
+            headers [dict]: HTTP headers of an outgoing TTS request
+        """
+        async with self._refresh_lock:
+            if not self._credentials.valid:
+                # Token refresh performs blocking I/O
+                await self._loop.run_in_executor(
+                    None, self._credentials.refresh, Request())
+
+        self._credentials.apply(headers)
+
+    async def _write(self, istream, data):
+        """
+        Writes bytes to input stream once its buffer has space, yielding to
+        other jobs meanwhile.
+
+        parameters:
+            istream [SimplexWriter]: input stream provided in TTS request job
+            data           [bytes]: bytes or packet table to be written
+        """
+        # Suspend until the reader drains the stream buffer, then write
+        # without blocking the event loop should another writer have filled
+        # it meanwhile
+        await istream.wait_for_space()
+        istream.write(data, block=False)
+
+    async def _handle(self, job):
+        """
+        Processes a TTS request job and writes response audio data to the
+        input stream provided in the job.
+
+        parameters:
+            job [(TTSRequest, SimplexWriter)]: TTS request job to be processed
+        """
+        request, istream = job
+        buffer = bytearray()
+        audio = None
+        try:
+            # Serve previously synthesized audio without a TTS request, the
+            # disk tier blocks on I/O
+            if self._cache is not None:
+                audio = await self._loop.run_in_executor(
+                    None, self._cache.lookup, request)
+                if audio is not None:
+                    await self._write(istream, audio)
+                    return None
+
+            headers = {'Content-Type': 'application/json'}
+            await self._authorize(headers)
+
+            # Send TTS request through Google Cloud API session
+            async with self._session.post(
+                    TTS_URL,
+                    data=request.fingerprint(),
+                    headers=headers) as response:
+                # Verify if request succeded
+                if response.status != 200:
+                    return None
+
+                # Iterate through response in chunks for processing
+                decoder = AudioContentDecoder()
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    data = decoder.decode(chunk)
+
+                    # Write decoded chunk to stream
+                    if data:
+                        await self._write(istream, data)
+                        buffer += data
+
+                    if decoder.is_done():
+                        # Parse Ogg pages off the event loop
+                        audio = await self._loop.run_in_executor(
+                            None, PacketTable.from_ogg, bytes(buffer))
+                        if self._cache is not None:
+                            await self._loop.run_in_executor(
+                                None, self._cache.store, request, audio)
+                        break
+        finally:
+            # Close input stream after processing response
+            istream.close()
+
+            # Deliver audio to identical requests which joined this one
+            for follower in self._flights.land(request):
+                self._track(self._loop.create_task(
+                    self._deliver(follower, audio)))
+
+    async def _deliver(self, istream, audio):
+        """
+        Writes response audio data of a coalesced TTS request to a follower.
+
+        parameters:
+            istream [SimplexWriter]: input stream of follower
+            audio     [PacketTable]: Opus packets of response audio, or None
+                                     if the request failed
+        """
+        try:
+            if audio is not None:
+                await self._write(istream, audio)
+        finally:
+            istream.close()
+
+    def _track(self, task):
+        """
+        Keeps track of a task so it can be cancelled on teardown.
+
+        parameters:
+            task [Task]: task to keep track of
+        """
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self):
+        """Processes the next job in the job queue once admitted."""
+        async with self._semaphore:
+            _, job = self._jobs.get(block=False)
+            try:
+                await self._handle(job)
+            except Exception:
+                log.exception('TTS request job failed')
+
+    def cached_audio(self, request):
+        """
+        Retrieves synthesized audio of a TTS request cached in memory, so it
+        can be shared instead of copied.
+
+        parameters:
+            request [TTSRequest]: TTS request to look up
+        returns:
+            PacketTable: Opus packets of audio, or None if not cached
+        """
+        if self._cache is None:
+            return None
+        return self._cache.lookup(request, disk=False)
+
+    def queue_stats(self):
+        """
+        Retrieves queueing statistics of each job flow.
+
+        returns:
+            dict: queue depth and average job wait time keyed by flow key
+        """
+        return self._jobs.stats()
+
+    def submit_job(self, job, key=None):
+        """
+        Submits a TTS request job to a fair job queue for processing. Jobs
+        whose audio is cached in memory are served right away. Must be called
+        from within the running event loop.
+
+        parameters:
+            job [(TTSRequest, SimplexWriter)]: TTS request job to be submitted
+            key [object] (default=None): hashable key identifying job flow,
+                                         such as a guild or (guild, user) ID
+        """
+        if self._terminated:
+            # Release input stream so readers do not wait on it
+            job[1].close()
+            return None
+
+        request, istream = job
+
+        if _serve_cached(self._cache, job):
+            return None
+
+        # Coalesce with an identical request already in flight
+        if self._flights.join(request, istream):
+            return None
+
+        self._jobs.put(job, key, len(request['input']['text']))
+
+        # Spawn a task for each job, tasks pick jobs in fair order
+        self._bind()
+        self._track(self._loop.create_task(self._run()))
+
+    def _cancel(self):
+        """
+        Cancels all active jobs.
+
+        returns:
+            bool: value of 'True' if jobs had not been cancelled before
+        """
+        # Check if teardown has already been performed
+        if self._terminated:
+            return False
+        self._terminated = True
+
+        if self._loop is not None and not self._loop.is_closed():
+            for task in list(self._tasks):
+                task.cancel()
+        return True
+
+    def teardown(self):
+        """
+        Cancels all active jobs. The HTTP session is closed in the background
+        if the event loop is running, use 'close' to wait for it instead.
+        """
+        if (self._cancel() and self._session is not None
+                and self._loop.is_running()):
+            self._loop.create_task(self._session.close())
+
+    async def close(self):
+        """
+        Cancels all active jobs and closes the HTTP session. Must be called
+        from within the running event loop.
+        """
+        self._cancel()
+        if self._session is not None:
+            await self._session.close()
@@ -8,9 +8,11 @@
 # Python Version: 3.8.1
 # License: MIT License
 
-from discord.oggparse import OggStream
+import json
 
-from blabber.stream import SimplexIOBase, SimplexReader, SimplexWriter
+from blabber.ogg import OggDemuxer, PacketTable
+from blabber.stream import (
+    MAX_BUFFERED, SimplexIOBase, SimplexReader, SimplexWriter)
 
 
 class TTSRequest(dict):
@@ -38,6 +40,16 @@ class TTSRequest(dict):
         self['voice']['name'] = name
         self['voice']['ssmlGender'] = gender
 
+    def fingerprint(self):
+        """
+        Computes the canonical request body. Requests with equal fingerprints
+        produce identical audio.
+
+        returns:
+            str: canonical JSON encoding of request
+        """
+        return json.dumps(self, sort_keys=True, separators=(',', ':'))
+
 
 class TTSRequestDispatcher():
     """
@@ -47,10 +59,16 @@ class TTSRequestDispatcher():
 
     parameters:
         pool [TTSRequestHandlerPool]: handler pool for processing TTS requests
+        key [object] (default=None): key used to schedule TTS requests fairly
+        max_buffered [int] (default=MAX_BUFFERED): number of unread bytes
+                                                   buffered before response
+                                                   audio writes are held back
     """
-    def __init__(self, pool):
+    def __init__(self, pool, key=None, max_buffered=MAX_BUFFERED):
         self._pool = pool
-        self._io_base = SimplexIOBase()
+        self._key = key
+        self._max_buffered = max_buffered
+        self._io_base = SimplexIOBase(max_buffered)
         self._ostream = SimplexReader(self._io_base)
 
     def __del__(self):
@@ -58,13 +76,61 @@ class TTSRequestDispatcher():
 
     def iter_packets(self):
         """
-        Generator used for producing Opus encoded audio packets.
+        Generator used for producing Opus encoded audio packets. Packet
+        tables in the output stream are replayed without parsing.
 
         yields:
             bytes: Opus encoded audio packet
         """
-        # Send output stream to OggStream object for Opus packet extraction
-        yield from OggStream(self._ostream).iter_packets()
+        # Keep reading the same output stream even if it is cleared
+        ostream = self._ostream
+        while True:
+            # Extract Opus packets from output stream without copying
+            yield from OggDemuxer().iter_packets(ostream)
+
+            # Replay packet table which stopped extraction, if any
+            table = ostream.read_table()
+            if table is None:
+                break
+            yield from table
+
+    def read_audio(self):
+        """
+        Reads all audio of submitted TTS requests into a single packet table.
+        Blocks until every submitted TTS request has been processed. Audio
+        written as a single packet table, such as cached audio, is returned
+        as is rather than copied.
+
+        returns:
+            PacketTable: Opus packets of audio
+        """
+        tables = []
+        ostream = self._ostream
+        while True:
+            # Parse audio written as bytes up to the next packet table
+            data = ostream.read()
+            if data:
+                tables.append(PacketTable.from_ogg(data))
+
+            table = ostream.read_table()
+            if table is None:
+                break
+            tables.append(table)
+
+        if len(tables) == 1:
+            return tables[0]
+        return PacketTable.from_packets(
+            packet for table in tables for packet in table)
+
+    def has_pending(self):
+        """
+        Query to determine if submitted TTS requests have audio left to be
+        read.
+
+        returns:
+            bool: value of 'True' if audio remains or is still being written
+        """
+        return self._io_base.has_pending()
 
     def clear(self):
         """
@@ -72,7 +138,7 @@ class TTSRequestDispatcher():
         """
         self._ostream.close()
 
-        self._io_base = SimplexIOBase()
+        self._io_base = SimplexIOBase(self._max_buffered)
         self._ostream = SimplexReader(self._io_base)
 
     async def submit_request(self, request):
@@ -84,7 +150,20 @@ class TTSRequestDispatcher():
         """
         # Spawn a new input stream to receive response audio data
         istream = SimplexWriter(self._io_base)
-        self._pool.submit_job((request, istream))
+        self._pool.submit_job((request, istream), self._key)
 
         # Block until data is available in output stream
         await self._ostream.wait_for_data()
+
+    def submit_audio(self, audio):
+        """
+        Submits previously synthesized audio for playback after any submitted
+        TTS requests. The packet table is read in place, so it can be shared
+        by any number of dispatchers.
+
+        parameters:
+            audio [PacketTable]: Opus packets of audio
+        """
+        istream = SimplexWriter(self._io_base)
+        istream.write(audio, block=False)
+        istream.close()
@@ -0,0 +1,205 @@
+# scheduler.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Cost credited to a flow each round, equal to the longest TTS message
+QUANTUM = 600
+
+# Smoothing factor of moving average for flow wait time
+SMOOTHING_FACTOR = 0.2
+
+# Time in secs statistics of a flow are kept after its last job is retrieved
+STATS_TTL = 300
+
+
+class FlowStats():
+    """
+    Queueing statistics of a single flow in a fair job queue.
+
+    attributes:
+        depth       [int]: number of jobs currently queued
+        submitted   [int]: total number of jobs submitted
+        served      [int]: total number of jobs retrieved
+        wait_time [float]: moving average of time in secs jobs waited
+    """
+    def __init__(self):
+        self.depth = 0
+        self.submitted = 0
+        self.served = 0
+        self.wait_time = 0.0
+
+    def as_dict(self):
+        """
+        Retrieves statistics as a dictionary.
+
+        returns:
+            dict: queueing statistics of flow
+        """
+        return {
+            'depth': self.depth,
+            'submitted': self.submitted,
+            'served': self.served,
+            'wait_time': self.wait_time,
+        }
+
+
+class FairJobQueue():
+    """
+    Thread-safe job queue which serves flows of jobs in deficit round-robin
+    order. Jobs within a flow are retrieved in FIFO order, while each flow
+    receives an equal share of work measured by job cost.
+
+    parameters:
+        quantum [int] (default=QUANTUM): cost credited to a flow each round
+        stats_ttl [float] (default=STATS_TTL): time in secs statistics of an
+                                               idle flow are kept
+    """
+    def __init__(self, quantum=QUANTUM, stats_ttl=STATS_TTL):
+        self._quantum = quantum
+        self._stats_ttl = stats_ttl
+
+        # Pending jobs of each flow and round-robin order of active flows
+        self._flows = dict()
+        self._deficits = dict()
+        self._active = deque()
+        self._size = 0
+
+        # Statistics of each flow and time each idle flow became idle, in
+        # order of becoming idle
+        self._stats = dict()
+        self._idle = OrderedDict()
+
+        # Condition variable for synchronized access between threads
+        self._cond = threading.Condition()
+
+    def qsize(self):
+        """
+        Query to determine number of queued jobs across all flows.
+
+        returns:
+            int: number of queued jobs
+        """
+        with self._cond:
+            return self._size
+
+    def put(self, job, key=None, cost=1):
+        """
+        Adds a job to the end of a flow.
+
+        parameters:
+            job [object]: job to be queued
+            key [object] (default=None): hashable key identifying job flow
+            cost  [int] (default=1): amount of work required by job
+        """
+        with self._cond:
+            flow = self._flows.get(key)
+            if flow is None:
+                flow = self._flows[key] = deque()
+                self._deficits[key] = 0
+                self._active.append(key)
+
+            flow.append((time.monotonic(), cost, job))
+            self._size += 1
+
+            self._idle.pop(key, None)
+            stats = self._stats.setdefault(key, FlowStats())
+            stats.depth += 1
+            stats.submitted += 1
+
+            self._prune()
+            self._cond.notify()
+
+    def _next(self):
+        """
+        Removes next job in deficit round-robin order. Caller must hold
+        condition variable and ensure queue is not empty.
+
+        returns:
+            tuple: key of flow, submission time and job
+        """
+        while True:
+            key = self._active[0]
+            flow = self._flows[key]
+            submitted, cost, job = flow[0]
+
+            # Serve flow while it has enough credit, otherwise move on
+            if self._deficits[key] >= cost:
+                self._deficits[key] -= cost
+                flow.popleft()
+                break
+
+            self._deficits[key] += self._quantum
+            self._active.rotate(-1)
+
+        # Idle flows do not accumulate credit
+        if not flow:
+            del self._flows[key]
+            del self._deficits[key]
+            self._active.popleft()
+
+        self._size -= 1
+        return key, submitted, job
+
+    def get(self, block=True, timeout=None):
+        """
+        Removes and returns the next job. Blocks until a job is available if
+        'block' is set.
+
+        parameters:
+            block   [bool] (default=True): value of 'True' to wait for a job
+            timeout [float] (default=None): maximum time in secs to wait
+        raises:
+            queue.Empty: raised when no job is available
+        returns:
+            tuple: submission time and job
+        """
+        with self._cond:
+            if block:
+                if not self._cond.wait_for(lambda: self._size, timeout):
+                    raise queue.Empty
+            elif not self._size:
+                raise queue.Empty
+
+            key, submitted, job = self._next()
+
+            now = time.monotonic()
+            stats = self._stats[key]
+            stats.depth -= 1
+            stats.served += 1
+            stats.wait_time += SMOOTHING_FACTOR * (
+                now - submitted - stats.wait_time)
+            if not stats.depth:
+                self._idle[key] = now
+
+            return submitted, job
+
+    def _prune(self):
+        """
+        Drops statistics of flows idle for longer than the statistics time to
+        live. Caller must hold condition variable.
+        """
+        expiry = time.monotonic() - self._stats_ttl
+        while self._idle:
+            key, idle_since = next(iter(self._idle.items()))
+            if idle_since > expiry:
+                break
+            del self._idle[key]
+            del self._stats[key]
+
+    def stats(self):
+        """
+        Retrieves queueing statistics of every flow active within the
+        statistics time to live.
+
+        returns:
+            dict: queueing statistics keyed by flow key
+        """
+        with self._cond:
+            self._prune()
+            return {key: stats.as_dict() for key, stats in self._stats.items()}
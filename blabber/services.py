@@ -9,29 +9,346 @@
 # License: MIT License
 
 import os
+import threading
+import time
+from collections import deque
 
 import mysql.connector
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Maximum number of open connections per pool
+POOL_SIZE = 8
+
+# Time in secs a connection is used before it is replaced
+MAX_LIFETIME = 3600
+
+# Time in secs a connection may sit idle before it is checked on checkout
+HEALTH_CHECK_INTERVAL = 30
+
+# Time in secs a checkout waits for a connection when the pool is exhausted
+CHECKOUT_TIMEOUT = 5.0
+
+# Smoothing factor of moving average for checkout latency
+SMOOTHING_FACTOR = 0.2
+
+# Shared connection pools keyed by credentials
+_pools = dict()
+_pools_lock = threading.Lock()
+
+
+def db_key(snowflake):
+    """
+    Converts a discord ID into the key rows are stored under. Rows have
+    always been keyed by the hash of discord objects, which is their ID
+    shifted right 22 bits.
+
+    parameters:
+        snowflake [int]: ID of discord object
+    returns:
+        int: database key of discord object
+    """
+    return snowflake >> 22
+
+
+class ConnectionPool():
+    """
+    Bounded pool of database connections shared between threads, so queries
+    do not pay for a connection handshake each. Idle connections are reused
+    most recently released first. A connection idle for longer than the
+    health check interval is pinged before being handed out, and one older
+    than the maximum lifetime is replaced. Checkouts wait for a connection
+    to be released while the pool is exhausted, up to a timeout.
+
+    parameters:
+        username [str]: username for connection to MySQLConnection
+        password [str]: password for connection to MySQLConnection
+        max_size [int] (default=POOL_SIZE): maximum number of open
+                                            connections
+        max_lifetime [float] (default=MAX_LIFETIME): time in secs a
+                                                     connection is used
+        timeout [float] (default=CHECKOUT_TIMEOUT): time in secs a checkout
+                                                    waits for a connection
+    attributes:
+        checkouts   [int]: number of connections handed out
+        waits       [int]: number of checkouts which waited on an exhausted
+                           pool
+        timeouts    [int]: number of checkouts which timed out
+        created     [int]: number of connections opened
+        recycled    [int]: number of connections closed for their age
+        failed_checks [int]: number of idle connections which failed a health
+                             check
+        latency   [float]: moving average of time in secs to check out a
+                           connection
+        max_latency [float]: longest time in secs taken to check out a
+                             connection
+    """
+    def __init__(self, username, password, max_size=POOL_SIZE,
+                 max_lifetime=MAX_LIFETIME, timeout=CHECKOUT_TIMEOUT):
+        self._username = username
+        self._password = password
+        self._max_size = max_size
+        self._max_lifetime = max_lifetime
+        self._timeout = timeout
+
+        # Idle connections with their creation and release times, number of
+        # open connections and creation times of connections in use
+        self._idle = deque()
+        self._size = 0
+        self._in_use = dict()
+        self._closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.failed_checks = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+        # Condition variable for synchronized access between threads
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        """
+        Opens a new connection to the database.
+
+        returns:
+            MySQLConnection: connection to database
+        """
+        cnx = mysql.connector.connect(
+            user=self._username,
+            password=self._password,
+            host=os.getenv('db_host'),
+            database=os.getenv('db_name')
+        )
+        with self._cond:
+            self.created += 1
+        return cnx
+
+    def _check(self, cnx, created, released):
+        """
+        Decides whether an idle connection can be handed out, closing it if
+        not.
+
+        parameters:
+            cnx [MySQLConnection]: idle connection
+            created      [float]: time connection was opened
+            released     [float]: time connection was released
+        returns:
+            bool: value of 'True' if connection can be handed out
+        """
+        now = time.monotonic()
+        if now - created >= self._max_lifetime:
+            with self._cond:
+                self.recycled += 1
+        elif now - released < HEALTH_CHECK_INTERVAL:
+            return True
+        else:
+            try:
+                cnx.ping()
+                return True
+            except mysql.connector.Error:
+                with self._cond:
+                    self.failed_checks += 1
+
+        self._close(cnx)
+        return False
+
+    @staticmethod
+    def _close(cnx):
+        """
+        Closes a connection, ignoring errors of one already broken.
+
+        parameters:
+            cnx [MySQLConnection]: connection closed
+        """
+        try:
+            cnx.close()
+        except mysql.connector.Error:
+            pass
+
+    def acquire(self):
+        """
+        Checks out a connection, opening one if none are idle and the pool
+        is not full.
+
+        raises:
+            PoolError: raised when no connection was released in time or the
+                       pool is closed
+        returns:
+            MySQLConnection: connection to database
+        """
+        start = time.monotonic()
+        deadline = start + self._timeout
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._size >= self._max_size:
+                if self._closed:
+                    raise mysql.connector.errors.PoolError(
+                        'connection pool is closed')
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise mysql.connector.errors.PoolError(
+                        'timed out waiting for a connection')
+
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self._cond.wait(remaining)
+
+            if self._closed:
+                raise mysql.connector.errors.PoolError(
+                    'connection pool is closed')
+
+            if self._idle:
+                cnx, created, released = self._idle.pop()
+            else:
+                cnx = None
+                self._size += 1
+
+        if cnx is not None and not self._check(cnx, created, released):
+            # Replace connection which was closed by the check
+            cnx = None
+
+        if cnx is None:
+            try:
+                cnx = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            created = time.monotonic()
+
+        end = time.monotonic()
+        with self._cond:
+            self._in_use[cnx] = created
+            self.checkouts += 1
+            self.latency += SMOOTHING_FACTOR * (end - start - self.latency)
+            self.max_latency = max(self.max_latency, end - start)
+        return cnx
+
+    def release(self, cnx, failed=False):
+        """
+        Returns a checked out connection to the pool. A transaction left open
+        is rolled back, and a connection which fails to do so is closed.
+
+        parameters:
+            cnx [MySQLConnection]: connection checked out from pool
+            failed [bool] (default=False): value of 'True' if connection was
+                                           used by a failed operation
+        """
+        with self._cond:
+            created = self._in_use.pop(cnx)
+
+        reusable = not self._closed
+        if reusable:
+            try:
+                # Do not keep a stale snapshot or locks held by a transaction,
+                # and make sure a failed connection still works
+                if failed or cnx.in_transaction:
+                    cnx.rollback()
+            except mysql.connector.Error:
+                reusable = False
+        if not reusable:
+            self._close(cnx)
+
+        with self._cond:
+            if reusable and not self._closed:
+                self._idle.append((cnx, created, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        """
+        Closes idle connections. Connections in use are closed when released.
+        """
+        with self._cond:
+            self._closed = True
+            idle = self._idle
+            self._idle = deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for cnx, _, _ in idle:
+            self._close(cnx)
+
+    def stats(self):
+        """
+        Retrieves usage statistics of pool.
+
+        returns:
+            dict: open, idle and in use connection counts, checkout, wait,
+                  timeout, creation, recycling and failed health check counts
+                  and checkout latencies
+        """
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'recycled': self.recycled,
+                'failed_checks': self.failed_checks,
+                'latency': self.latency,
+                'max_latency': self.max_latency,
+            }
+
+
+def connection_pool(username, password):
+    """
+    Retrieves the connection pool shared by every service using the given
+    credentials, creating it on first use.
+
+    parameters:
+        username [str]: username for connection to MySQLConnection
+        password [str]: password for connection to MySQLConnection
+    returns:
+        ConnectionPool: shared connection pool
+    """
+    with _pools_lock:
+        pool = _pools.get((username, password))
+        if pool is None:
+            pool = ConnectionPool(username, password)
+            _pools[(username, password)] = pool
+        return pool
+
+
+def close_pools():
+    """
+    Closes every shared connection pool.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
 
 class ConnectionManager:
     """
-    Manages connection to the database.
+    Manages connection to the database, checked out from the connection pool
+    shared by every service.
 
     parameters:
         username [str]: username for connction to MySQLConnection
         password [str]: password for connction to MySQLConnection
     """
     def __init__(self, username, password):
-        """Initializes connection."""
-        self._cnx = mysql.connector.connect(
-            user=username,
-            password=password,
-            host=os.getenv('db_host'),
-            database=os.getenv('db_name')
-        )
+        """Checks out connection."""
+        self._pool = connection_pool(username, password)
+        self._cnx = self._pool.acquire()
 
     def __enter__(self):
         """
@@ -44,9 +361,9 @@ class ConnectionManager:
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         """
-        Closes connection to the database.
+        Returns connection to the connection pool.
         """
-        self._cnx.close()
+        self._pool.release(self._cnx, exc_type is not None)
 
 
 class UserService:
@@ -57,15 +374,15 @@ class UserService:
     def __init__(self):
         pass
 
-    def insert(self, user, channel, alias):
+    def insert(self, user_id, channel_id, alias):
         """
         Creates and updates a voice profile for a user in a channel. A user 
         can have a distinct voice profile on a given channel.
 
         parameters:
-            user       [User]: discord User Object
-            channel [Channel]: discord Channel Object
-            alias       [str]: string object representing a voice
+            user_id    [int]: ID of discord User
+            channel_id [int]: ID of discord Channel
+            alias      [str]: string object representing a voice
         returns:
             int: integer representing successful insertion or update
         """
@@ -73,7 +390,7 @@ class UserService:
                  "(user, channel, voice_alias) "
                  "VALUES (%s, %s, %s) "
                  "ON DUPLICATE KEY UPDATE voice_alias = %s")
-        data = (int(hash(user)), int(hash(channel)), str(alias), str(alias))
+        data = (db_key(user_id), db_key(channel_id), str(alias), str(alias))
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
@@ -82,39 +399,55 @@ class UserService:
             cursor.close()
             return cursor.rowcount
 
-    def select(self, user, channel):
+    def select(self, user_id, channel_id):
         """
         Retrieves user's voice profile for a specified channel.
 
         parameters:
-            user       [User]: discord User Object
-            channel [Channel]: discord Channel object
+            user_id    [int]: ID of discord User
+            channel_id [int]: ID of discord Channel
         returns:
             tuple: voice profile retrieved from the database
         """
         query = ("SELECT voice_alias "
                  "FROM   voice_profiles "
                  "WHERE  user = %s AND channel = %s")
-        data = (int(hash(user)), int(hash(channel)))
+        data = (db_key(user_id), db_key(channel_id))
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
             cursor.execute(query, data)
             return cursor.fetchone()
 
-    def delete(self, user, channel):
+    def select_users(self):
+        """
+        Retrieves every user who has a voice profile in any channel.
+
+        returns:
+            list: database keys of users, as produced by 'db_key'
+        """
+        query = ("SELECT DISTINCT user FROM voice_profiles")
+
+        with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
+            cursor = cnx.cursor(buffered=True)
+            cursor.execute(query)
+            users = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            return users
+
+    def delete(self, user_id, channel_id):
         """
         Deletes specified row from the voice_profile table.
 
         parameters:
-            user       [User]: discord User Object
-            channel [Channel]: discord Channel object
+            user_id    [int]: ID of discord User
+            channel_id [int]: ID of discord Channel
         returns:
             int: integer representing a voice successfully removed
         """
         query = ("DELETE FROM voice_profiles "
                  "WHERE user = %s AND channel = %s")
-        data = (int(hash(user)), int(hash(channel)))
+        data = (db_key(user_id), db_key(channel_id))
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
@@ -124,6 +457,44 @@ class UserService:
             return cursor.rowcount
 
 
+    def write_many(self, inserts, deletes):
+        """
+        Creates, updates and deletes many voice profiles in a single
+        transaction.
+
+        parameters:
+            inserts [list]: tuples of discord User ID, Channel ID and voice
+                            alias
+            deletes [list]: tuples of discord User ID and Channel ID
+        returns:
+            int: integer representing number of rows changed
+        """
+        insert_query = ("INSERT INTO voice_profiles "
+                        "(user, channel, voice_alias) "
+                        "VALUES (%s, %s, %s) "
+                        "ON DUPLICATE KEY UPDATE "
+                        "voice_alias = VALUES(voice_alias)")
+        delete_query = ("DELETE FROM voice_profiles "
+                        "WHERE user = %s AND channel = %s")
+        insert_data = [(db_key(user_id), db_key(channel_id), str(alias))
+                       for user_id, channel_id, alias in inserts]
+        delete_data = [(db_key(user_id), db_key(channel_id))
+                       for user_id, channel_id in deletes]
+
+        with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
+            cursor = cnx.cursor(buffered=True)
+            rowcount = 0
+            if insert_data:
+                cursor.executemany(insert_query, insert_data)
+                rowcount += cursor.rowcount
+            if delete_data:
+                cursor.executemany(delete_query, delete_data)
+                rowcount += cursor.rowcount
+            cnx.commit()
+            cursor.close()
+            return rowcount
+
+
 class GuildService:
     """
     Object that handles the connection, disconnection, and data updates
@@ -133,19 +504,19 @@ class GuildService:
     def __init__(self):
         pass
 
-    def insert(self, guild, prefix):
+    def insert(self, guild_id, prefix):
         """
         Creates and updates the guild prefix in the database.
 
         parameters:
-            guild [Guild]: discord Guild object
-            prefix  [str]: new prefix
+            guild_id [int]: ID of discord Guild
+            prefix   [str]: new prefix
         returns:
             int: integer representing successful insertion or update
         """
         query = ("INSERT INTO guilds (guild, prefix) "
                  "VALUES (%s, %s) ON DUPLICATE KEY UPDATE prefix = %s")
-        data = (int(hash(guild)), str(prefix), str(prefix))
+        data = (db_key(guild_id), str(prefix), str(prefix))
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
@@ -154,35 +525,61 @@ class GuildService:
             cursor.close()
             return cursor.rowcount
 
-    def select(self, guild):
+    def select(self, guild_id):
         """
         Retrieves user's voice profile for a specified channel.
 
         parameters:
-            user       [User]: discord User Object
-            channel [Channel]: discord Channel object
+            user_id    [int]: ID of discord User
+            channel_id [int]: ID of discord Channel
         returns:
             tuple: voice profile retrieved from the database
         """
         query = ("SELECT prefix FROM guilds WHERE guild = %s LIMIT 1")
-        data = (int(hash(guild)),)
+        data = (db_key(guild_id),)
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
             cursor.execute(query, data)
             return cursor.fetchone()
 
-    def delete(self, guild):
+    def select_many(self, guild_ids, chunk_size=500):
+        """
+        Retrieves prefixes of many guilds with one query per chunk of guilds.
+
+        parameters:
+            guild_ids [list]: IDs of discord Guilds
+            chunk_size [int] (default=500): number of guilds per query
+        returns:
+            dict: prefixes keyed by ID of discord Guild
+        """
+        rows = dict()
+        keys = [db_key(guild_id) for guild_id in guild_ids]
+
+        with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
+            cursor = cnx.cursor(buffered=True)
+            for start in range(0, len(keys), chunk_size):
+                data = tuple(keys[start:start + chunk_size])
+                query = ("SELECT guild, prefix FROM guilds "
+                         f"WHERE guild IN ({', '.join(['%s'] * len(data))})")
+                cursor.execute(query, data)
+                rows.update(cursor.fetchall())
+            cursor.close()
+
+        return {guild_id: rows[key]
+                for guild_id, key in zip(guild_ids, keys) if key in rows}
+
+    def delete(self, guild_id):
         """
         Removes specified row from the guilds table.
 
         parameters:
-            guild [Guild]: discord Guild object
+            guild_id [int]: ID of discord Guild
         returns:
             int: integer representing successful removal.
         """
         query = ("DELETE FROM guilds WHERE guild = %s")
-        data = (int(hash(guild)),)
+        data = (db_key(guild_id),)
 
         with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
             cursor = cnx.cursor(buffered=True)
@@ -190,3 +587,35 @@ class GuildService:
             cnx.commit()
             cursor.close()
             return cursor.rowcount
+
+    def write_many(self, inserts, deletes):
+        """
+        Creates, updates and removes many guild prefixes in a single
+        transaction.
+
+        parameters:
+            inserts [list]: tuples of discord Guild ID and prefix
+            deletes [list]: IDs of discord Guilds
+        returns:
+            int: integer representing number of rows changed
+        """
+        insert_query = ("INSERT INTO guilds (guild, prefix) "
+                        "VALUES (%s, %s) "
+                        "ON DUPLICATE KEY UPDATE prefix = VALUES(prefix)")
+        delete_query = ("DELETE FROM guilds WHERE guild = %s")
+        insert_data = [(db_key(guild_id), str(prefix))
+                       for guild_id, prefix in inserts]
+        delete_data = [(db_key(guild_id),) for guild_id in deletes]
+
+        with ConnectionManager(os.getenv('db_user'), os.getenv('db_pw')) as cnx:
+            cursor = cnx.cursor(buffered=True)
+            rowcount = 0
+            if insert_data:
+                cursor.executemany(insert_query, insert_data)
+                rowcount += cursor.rowcount
+            if delete_data:
+                cursor.executemany(delete_query, delete_data)
+                rowcount += cursor.rowcount
+            cnx.commit()
+            cursor.close()
+            return rowcount
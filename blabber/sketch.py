@@ -0,0 +1,143 @@
+# sketch.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import threading
+from array import array
+from bisect import bisect_left
+
+# Odd multipliers used to derive the counter index of each sketch row
+SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+
+# Largest value held by a counter
+MAX_COUNT = 15
+
+# Translation table which halves every counter
+HALVE = bytes(count >> 1 for count in range(256))
+
+
+class FrequencySketch():
+    """
+    Count-min sketch estimating how often keys were accessed recently, used
+    for TinyLFU cache admission. Counters saturate at MAX_COUNT and are all
+    halved once ten accesses per counter have been recorded, so old
+    popularity fades.
+
+    parameters:
+        capacity [int]: number of entries of the cache being admitted to
+    """
+    def __init__(self, capacity):
+        # Counters per row, rounded up to a power of two
+        self._bits = max(4, (max(capacity, 1) - 1).bit_length())
+        width = 1 << self._bits
+
+        self._rows = [bytearray(width) for _ in SEEDS]
+        self._additions = 0
+        self._sample_size = 10 * width
+
+    def _indexes(self, key):
+        """
+        Computes counter index of a key in each sketch row.
+
+        parameters:
+            key [object]: hashable key
+        returns:
+            list: counter index in each row
+        """
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        shift = 64 - self._bits
+        return [((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift for seed in SEEDS]
+
+    def increment(self, key):
+        """
+        Records an access of a key.
+
+        parameters:
+            key [object]: hashable key
+        """
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < MAX_COUNT:
+                row[index] += 1
+
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._rows = [row.translate(HALVE) for row in self._rows]
+            self._additions //= 2
+
+    def estimate(self, key):
+        """
+        Estimates number of recent accesses of a key.
+
+        parameters:
+            key [object]: hashable key
+        returns:
+            int: estimated access count
+        """
+        return min(row[index]
+                   for row, index in zip(self._rows, self._indexes(key)))
+
+
+class IntSet():
+    """
+    Compact set of integers stored as a sorted array of 64-bit values, using
+    8 bytes per member instead of the ~60 taken by a set of ints. Membership
+    is tested by binary search. Safe to access from handler threads.
+
+    parameters:
+        members [iterable] (default=()): initial integers of set
+    """
+    def __init__(self, members=()):
+        self._members = array('q', sorted(set(members)))
+
+        # Internal Lock for synchronized access between threads
+        self._lock = threading.Lock()
+
+    def add(self, member):
+        """
+        Adds an integer to set.
+
+        parameters:
+            member [int]: integer added
+        """
+        with self._lock:
+            index = bisect_left(self._members, member)
+            if (index == len(self._members)
+                    or self._members[index] != member):
+                self._members.insert(index, member)
+
+    def update(self, members):
+        """
+        Adds many integers to set.
+
+        parameters:
+            members [iterable]: integers added
+        """
+        members = set(members)
+        with self._lock:
+            members.update(self._members)
+            self._members = array('q', sorted(members))
+
+    def __contains__(self, member):
+        with self._lock:
+            index = bisect_left(self._members, member)
+            return (index < len(self._members)
+                    and self._members[index] == member)
+
+    def __len__(self):
+        return len(self._members)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by members.
+
+        returns:
+            int: size in bytes
+        """
+        return len(self._members) * self._members.itemsize
@@ -9,28 +9,350 @@
 # License: MIT License
 
 import asyncio
-import queue
 import threading
-import time
+from collections import deque
+
+from blabber.ogg import PacketTable
+
+# Default number of unread bytes an I/O base object buffers before writes
+# are held back
+MAX_BUFFERED = 512 * 1024
+
+
+def _sizeof(chunk):
+    """
+    Measures size of a chunk of data.
+
+    parameters:
+        chunk [bytes]: bytes or packet table
+    returns:
+        int: size in bytes
+    """
+    if isinstance(chunk, PacketTable):
+        return chunk.nbytes
+    return len(chunk)
+
+
+def _wake(future):
+    """
+    Completes a future if it has not been completed or cancelled.
+
+    parameters:
+        future [Future]: future awaited by a read accessor
+    """
+    if not future.done():
+        future.set_result(None)
+
+
+class ChunkBuffer():
+    """
+    FIFO byte buffer holding written chunks as a list of memoryviews. Reads
+    which fall within a single chunk are served as memoryview slices without
+    copying, while reads spanning chunks copy only the bytes returned.
+    """
+    def __init__(self):
+        self._chunks = deque()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, chunk):
+        """
+        Adds a chunk to the end of the buffer without copying it.
+
+        parameters:
+            chunk [bytes]: bytes-like object to be buffered
+        """
+        view = memoryview(chunk).cast('B')
+        if view:
+            self._chunks.append(view)
+            self._size += len(view)
+
+    def read(self, size=-1):
+        """
+        Removes at most 'size' bytes from the front of the buffer. If the
+        'size' argument is negative, the whole buffer is removed.
+
+        parameters:
+            size [int] (default=-1): number of bytes to read
+        returns:
+            bytes: bytes-like object holding data removed from buffer
+        """
+        if size < 0 or size > self._size:
+            size = self._size
+        if not size:
+            return b''
+
+        self._size -= size
+        chunks = self._chunks
+
+        # Serve read from the first chunk if it is large enough
+        head = chunks[0]
+        if len(head) > size:
+            chunks[0] = head[size:]
+            return head[:size]
+        if len(head) == size:
+            return chunks.popleft()
+
+        # Gather read across chunk boundaries
+        parts = []
+        while size:
+            head = chunks.popleft()
+            if len(head) > size:
+                chunks.appendleft(head[size:])
+                head = head[:size]
+            parts.append(head)
+            size -= len(head)
+        return b''.join(parts)
+
+    def read1(self, size=-1):
+        """
+        Removes at most 'size' bytes from the first chunk of the buffer
+        without copying. If the 'size' argument is negative, the whole first
+        chunk is removed.
+
+        parameters:
+            size [int] (default=-1): number of bytes to read
+        returns:
+            bytes: bytes-like object holding data removed from buffer
+        """
+        if not self._chunks:
+            return b''
+
+        head = self._chunks[0]
+        if size < 0 or size >= len(head):
+            size = len(head)
+            self._chunks.popleft()
+        else:
+            self._chunks[0] = head[size:]
+
+        self._size -= size
+        return head[:size]
+
+
+class Segment():
+    """
+    Chunks of data written by a single write accessor, buffered until the
+    read accessor reaches them in playback order.
+
+    attributes:
+        chunks [deque]: unread bytes and packet tables of write accessor
+        size     [int]: number of unread bytes held in segment
+        open    [bool]: value of 'True' while write accessor is attached
+    """
+    def __init__(self):
+        self.chunks = deque()
+        self.size = 0
+        self.open = True
 
 
 class SimplexIOBase():
     """
     Uni-directional I/O base object that supports single-read/multi-write
-    operations. Attached write accessors are allowed to write in the order of
-    their creation.
+    operations. Each attached write accessor fills its own segment without
+    waiting for earlier writers, and the read accessor consumes segments in
+    the order their writers were attached. Read accessors block on a
+    condition variable until data is written or EOF is reached.
+
+    Unread data of all segments is bounded by the buffer limit: writers of
+    segments waiting to be read are held back while the total reaches it.
+    The write accessor currently being read is only held back by its own
+    unread data, so playback never waits on later writers. Unread data is
+    therefore bounded by twice the buffer limit.
+
+    parameters:
+        max_buffered [int] (default=MAX_BUFFERED): number of unread bytes
+                                                   buffered before writes
+                                                   are held back
     """
-    def __init__(self):
-        # Queue to pass data between accessors
-        self.chunks = queue.Queue()
+    def __init__(self, max_buffered=MAX_BUFFERED):
+        # Segments of attached write accessors, in playback order
+        self._segments = deque()
+        self._writers = dict()
+        self._max_buffered = max_buffered
+
+        # Number of unread bytes across all segments
+        self._buffered = 0
 
         self._reader = None
-        self._writer = None
-        self._future_writers = queue.Queue()
+
+        # Futures of accessors waiting for data or buffer space, with their
+        # event loops
+        self._waiters = []
+        self._space_waiters = []
 
         # Internal Lock for synchronized access between threads
         self._lock = threading.Lock()
 
+        # Condition variables signalled when data is written or EOF is reached
+        # and when buffer space is freed
+        self._readable = threading.Condition(self._lock)
+        self._writable = threading.Condition(self._lock)
+
+    def _notify(self):
+        """
+        Wakes up all read accessors waiting for data. Caller must hold
+        internal lock.
+        """
+        self._readable.notify_all()
+
+        for loop, future in self._waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        self._waiters.clear()
+
+    def _notify_space(self):
+        """
+        Wakes up all write accessors waiting for buffer space. Caller must
+        hold internal lock.
+        """
+        self._writable.notify_all()
+
+        for _, loop, future in self._space_waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        self._space_waiters.clear()
+
+    def _has_space(self, segment):
+        """
+        Query to determine if a write to a segment would not be held back.
+        The segment being read is limited by its own unread data, so it is
+        never held back by data of later segments. Caller must hold internal
+        lock.
+
+        parameters:
+            segment [Segment]: segment of write accessor
+        returns:
+            bool: value of 'True' if unread data is below the buffer limit or
+                  no read accessor is attached
+        """
+        if self._reader is None:
+            return True
+        if segment is self._segments[0]:
+            return segment.size < self._max_buffered
+        return self._buffered < self._max_buffered
+
+    def _has_data(self):
+        """
+        Query to determine if a read would not block. Caller must hold
+        internal lock.
+
+        returns:
+            bool: value of 'True' if the segment being read holds data or all
+                  write accessors have detached
+        """
+        return not self._segments or bool(self._segments[0].chunks)
+
+    def _advance(self):
+        """
+        Drops fully read segments of detached write accessors so the next
+        segment is read. Caller must hold internal lock.
+        """
+        segments = self._segments
+        advanced = False
+        while segments and not segments[0].open and not segments[0].chunks:
+            segments.popleft()
+            advanced = True
+
+        if advanced:
+            # Next writer may now be limited, or readers may reach new data
+            self._notify()
+            self._notify_space()
+
+    def add_space_waiter(self, writer, loop, future):
+        """
+        Registers a future to be completed from any thread once a write
+        accessor is no longer held back by the buffer limit.
+
+        parameters:
+            writer [SimplexWriter]: write accessor waiting for space
+            loop [AbstractEventLoop]: event loop of future
+            future          [Future]: future to be completed
+        """
+        with self._lock:
+            segment = self._writers.get(writer)
+            if segment is None or self._has_space(segment):
+                _wake(future)
+            else:
+                self._space_waiters.append((writer, loop, future))
+
+    def add_waiter(self, loop, future):
+        """
+        Registers a future to be completed from any thread once data is
+        written or all write accessors have detached.
+
+        parameters:
+            loop [AbstractEventLoop]: event loop of future
+            future          [Future]: future to be completed
+        """
+        with self._lock:
+            if self._has_data():
+                _wake(future)
+            else:
+                self._waiters.append((loop, future))
+
+    def put(self, writer, chunk, block=True):
+        """
+        Queues a chunk of data in a write accessor's segment, blocking while
+        the write accessor is held back by the buffer limit.
+
+        parameters:
+            writer [SimplexWriter]: write accessor writing chunk
+            chunk          [bytes]: bytes or packet table to be written
+            block [bool] (default=True): value of 'False' to queue chunk
+                                         without waiting for buffer space
+        """
+        with self._writable:
+            segment = self._writers[writer]
+            if block:
+                self._writable.wait_for(lambda: self._has_space(segment))
+
+            size = _sizeof(chunk)
+            segment.chunks.append(chunk)
+            segment.size += size
+            self._buffered += size
+            if segment is self._segments[0]:
+                self._notify()
+
+    def get(self):
+        """
+        Removes the oldest chunk of data in playback order, blocking until
+        one is written. EOF is reached once all write accessors or the read
+        accessor detach.
+
+        returns:
+            bytes: bytes or packet table written by a write accessor, or None
+                   at EOF
+        """
+        with self._readable:
+            self._readable.wait_for(
+                lambda: self._has_data() or self._reader is None)
+            if not self._segments or not self._segments[0].chunks:
+                return None
+
+            segment = self._segments[0]
+            held_back = (segment.size >= self._max_buffered
+                         or self._buffered >= self._max_buffered)
+
+            chunk = segment.chunks.popleft()
+            size = _sizeof(chunk)
+            segment.size -= size
+            self._buffered -= size
+            if held_back:
+                self._notify_space()
+            self._advance()
+            return chunk
+
+    def has_pending(self):
+        """
+        Query to determine if any written data is left to be read or a write
+        accessor is still attached.
+
+        returns:
+            bool: value of 'True' if a read would not reach EOF
+        """
+        with self._lock:
+            return bool(self._segments)
+
     def has_reader(self):
         """
         Query to determine if a read accessor is currently attached.
@@ -49,7 +371,7 @@ class SimplexIOBase():
             bool: value of 'True' if a write accessor is attached
         """
         with self._lock:
-            return self._writer is not None
+            return bool(self._writers)
         
     def attach_reader(self, reader):
         """
@@ -70,19 +392,15 @@ class SimplexIOBase():
 
     def attach_writer(self, writer):
         """
-        Attaches a write accessor.
+        Attaches a write accessor, whose data is read after that of every
+        write accessor attached before it.
 
         parameters:
             writer [SimplexWriter]: write accessor to attach
         """
         with self._lock:
-            # Check if a writer has been set
-            if self._writer:
-                # Lock writer and add to FIFO queue
-                writer.write_lock.acquire()
-                self._future_writers.put(writer)
-            else:
-                self._writer = writer
+            segment = self._writers[writer] = Segment()
+            self._segments.append(segment)
 
     def detach_reader(self, reader):
         """
@@ -95,29 +413,32 @@ class SimplexIOBase():
             if self._reader is reader:
                 self._reader = None
 
+                # Wake up read accessor blocked on a read and release write
+                # accessors held back by a full buffer
+                self._readable.notify_all()
+                self._notify_space()
+
     def detach_writer(self, writer):
         """
-        Detaches a write accessor.
+        Detaches a write accessor. Its buffered data is still read.
 
         parameters:
             writer [SimplexWriter]: write accessor to detach
         """
         with self._lock:
-            if self._writer is writer:
-                self._writer = None
-                # Loop through FIFO queue until a valid writer is found
-                while not self._future_writers.empty():
-                    next_writer = self._future_writers.get()
-                    # Check if writer is open
-                    if next_writer.is_open():
-                        next_writer.write_lock.release()
-                        self._writer = next_writer
-                        break
+            segment = self._writers.pop(writer, None)
+            if segment is not None:
+                segment.open = False
+
+                # Move on to the next segment, waking readers at EOF
+                self._advance()
 
 
 class SimplexReader():
     """
-    I/O base object accessor with read-only capabilities.
+    I/O base object accessor with read-only capabilities. Packet tables
+    written to the I/O base object act as boundaries: reads stop short of
+    them until they are retrieved with 'read_table'.
 
     parameters:
         io_base [SimplexIOBase]: I/O base object to read from
@@ -125,7 +446,8 @@ class SimplexReader():
     def __init__(self, io_base):
         self._io_base = io_base
         self._open = True
-        self._buffer = bytearray()
+        self._buffer = ChunkBuffer()
+        self._table = None
 
         # Internal Lock for synchronized access between threads
         self._lock = threading.Lock()
@@ -147,14 +469,18 @@ class SimplexReader():
             return self._open
 
     async def wait_for_data(self):
-        """Asynchronous spin-lock to poll I/O base object for data."""
+        """
+        Waits until data is available in I/O base object or EOF is reached.
+        Write accessors complete the wait from their own threads.
+        """
         with self._lock:
-            if len(self._buffer) != 0:
+            if len(self._buffer) != 0 or self._table is not None:
                 return None
 
-        # Keep polling until data is written to I/O base object
-        while self._io_base.chunks.empty():
-            await asyncio.sleep(0.05)
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._io_base.add_waiter(loop, future)
+        await future
 
     def close(self):
         """Closes read accessor and detaches I/O base object."""
@@ -165,76 +491,90 @@ class SimplexReader():
                 # Detatch reader from I/O base object
                 self._io_base.detach_reader(self)
 
-    def _read_all(self):
+    def _fill(self, size):
         """
-        Reads bytes from I/O base object until EOF is reached. Returns an empty
-        bytes object when read accessor is at EOF.
+        Moves written chunks into buffer until it holds 'size' bytes, a packet
+        table is reached or EOF is reached. Blocks until one of these occurs.
 
-        returns:
-            bytes: oldest unread data from I/O base object
+        parameters:
+            size [int]: number of bytes wanted, negative to read until EOF
         """
-        # Keep polling until EOF is reached
-        while self._io_base.has_writer() or not self._io_base.chunks.empty():
-            while not self._io_base.chunks.empty():
-                self._buffer += self._io_base.chunks.get()
+        while self._table is None and (size < 0 or len(self._buffer) < size):
+            chunk = self._io_base.get()
+            if chunk is None:
+                break
 
-            # Small sleep before resuming polling loop
-            if self._io_base.has_writer():
-                time.sleep(0.05)
-
-        # Return data which was read before EOF was reached
-        data = self._buffer
-        self._buffer = bytearray()
-        return bytes(data)
+            if isinstance(chunk, PacketTable):
+                self._table = chunk
+            else:
+                self._buffer.append(chunk)
 
     def read(self, size=-1):
         """
         Reads at most 'size' bytes from I/O base object. If the 'size' argument
         is negative, read until EOF is reached. Returns an empty bytes object
-        at EOF.
+        at EOF or when a packet table is next to be read.
 
         parameters:
             size [int] (default=-1): number of bytes to read
         raises:
             ValueError: raised when reading from a closed read accessor
         returns:
-            bytes: oldest unread data from attached I/O base object
+            bytes: bytes-like object holding oldest unread data from attached
+                   I/O base object, possibly a view of a written chunk
         """
         # Check if reader is closed
         with self._lock:
             if not self._open:
                 raise ValueError('I/O operation on closed accessor')
 
-        # Read until EOF if size parameter is negative
-        if size < 0:
-            return self._read_all()
+        # Block until enough data has been read or EOF is reached
+        self._fill(size)
 
-        # Check if buffer already contains amount of bytes to read
-        if len(self._buffer) >= size:
-            # Save remaining bytes to buffer
-            data = self._buffer[:size]
-            self._buffer = self._buffer[size:]
-            return bytes(data)
+        return self._buffer.read(size)
 
-        # Keep polling until enough data has been read or EOF is reached
-        while self._io_base.has_writer() or not self._io_base.chunks.empty():
-            while not self._io_base.chunks.empty():
-                self._buffer += self._io_base.chunks.get()
+    def read1(self, size=-1):
+        """
+        Reads at most 'size' bytes from the oldest written chunk, blocking
+        only until some data is available. If the 'size' argument is
+        negative, the rest of the chunk is read. Returns an empty bytes
+        object at EOF or when a packet table is next to be read.
 
-            # Break out of loop if enough bytes have been read
-            if len(self._buffer) >= size:
-                data = self._buffer[:size]
-                self._buffer = self._buffer[size:]
-                return bytes(data)
+        parameters:
+            size [int] (default=-1): number of bytes to read
+        raises:
+            ValueError: raised when reading from a closed read accessor
+        returns:
+            bytes: bytes-like object holding oldest unread data from attached
+                   I/O base object, as a view of a written chunk
+        """
+        # Check if reader is closed
+        with self._lock:
+            if not self._open:
+                raise ValueError('I/O operation on closed accessor')
 
-            # Small sleep before resuming polling loop
-            if self._io_base.has_writer():
-                time.sleep(0.05)
+        # Block until any data has been read or EOF is reached
+        self._fill(1)
 
-        # Return data which was read before EOF was reached
-        data = self._buffer
-        self._buffer = bytearray()
-        return bytes(data)
+        return self._buffer.read1(size)
+
+    def read_table(self):
+        """
+        Reads the packet table at which reading stopped. Must only be called
+        once 'read' returns an empty bytes object.
+
+        raises:
+            ValueError: raised when reading from a closed read accessor
+        returns:
+            PacketTable: next packet table, or None if at EOF
+        """
+        with self._lock:
+            if not self._open:
+                raise ValueError('I/O operation on closed accessor')
+
+        table = self._table
+        self._table = None
+        return table
 
 
 class SimplexWriter():
@@ -245,9 +585,6 @@ class SimplexWriter():
         io_base [SimplexIOBase]: I/O base object to write to
     """
     def __init__(self, io_base):
-        # Lock to ensure ordered writes to I/O base object
-        self.write_lock = threading.Lock()
-
         self._io_base = io_base
         self._open = True
 
@@ -279,12 +616,29 @@ class SimplexWriter():
                 # Detatch writer from I/O base object
                 self._io_base.detach_writer(self)
 
-    def write(self, data):
+    async def wait_for_space(self):
+        """
+        Waits until the I/O base object accepts a write without holding it
+        back. Lets asynchronous writers suspend instead of blocking.
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._io_base.add_space_waiter(self, loop, future)
+        await future
+
+    def write(self, data, block=True):
         """
-        Writes bytes to I/O base object.
+        Writes bytes or a packet table to I/O base object without waiting for
+        earlier write accessors. Blocks while unread data is at the buffer
+        limit of the I/O base object, unless 'block' is unset. Writes which
+        do not block are meant for data held in memory anyway, such as cached
+        or shared packet tables, as holding them back would not bound memory
+        use and would only delay playback.
 
         parameters:
-            data [bytes]: bytes to be written
+            data [bytes]: bytes or packet table to be written
+            block [bool] (default=True): value of 'False' to write without
+                                         waiting for buffer space
         raises:
             ValueError: raised when writing to a closed write accessor
         returns:
@@ -295,7 +649,6 @@ class SimplexWriter():
             if not self._open:
                 raise ValueError('I/O operation on closed accessor')
 
-        with self.write_lock:
-            self._io_base.chunks.put(data)
+        self._io_base.put(self, data, block)
 
-        return len(data)
+        return _sizeof(data)
@@ -0,0 +1,224 @@
+# writebehind.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import threading
+import time
+
+# Time in secs a write is held before its batch is flushed
+FLUSH_INTERVAL = 1.0
+
+# Number of pending keys at which a batch is flushed early
+FLUSH_SIZE = 100
+
+# Longest time in secs a failed batch waits before it is retried
+MAX_BACKOFF = 60.0
+
+# Smoothing factor of moving averages for flush latency
+SMOOTHING_FACTOR = 0.2
+
+
+class WriteBehindQueue():
+    """
+    Queue of pending database writes which are coalesced per key and flushed
+    in batches by a background thread. A batch is flushed once its oldest
+    write has waited for the flush interval or enough keys are pending,
+    whichever comes first. Batches are always written in order, and a batch
+    which fails to be written is retried with the next one after a backoff
+    which doubles with every failure, however many keys are pending. Values
+    stay visible to 'get' until their batch has been written.
+
+    parameters:
+        write [callable]: function writing a dict of pending values by key
+        interval [float] (default=FLUSH_INTERVAL): time in secs a write is
+                                                   held before flushing
+        max_pending [int] (default=FLUSH_SIZE): number of pending keys
+                                                flushed early
+    attributes:
+        flushes    [int]: number of batches written
+        rows       [int]: number of keys written
+        coalesced  [int]: number of writes replaced before being flushed
+        failures   [int]: number of batches which failed to be written
+        latency  [float]: moving average of time in secs to write a batch
+        max_latency [float]: longest time in secs taken to write a batch
+        lag      [float]: moving average of time in secs writes waited
+    """
+    def __init__(self, write, interval=FLUSH_INTERVAL, max_pending=FLUSH_SIZE):
+        self._write = write
+        self._interval = interval
+        self._max_pending = max_pending
+
+        # Pending values by key, values of batch being written, time of
+        # oldest pending write, time the batch is due to be flushed and
+        # backoff of a failed batch
+        self._pending = dict()
+        self._flushing = dict()
+        self._oldest = None
+        self._due = None
+        self._backoff = 0.0
+        self._closed = False
+
+        self.flushes = 0
+        self.rows = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.lag = 0.0
+
+        # Condition variable for synchronized access between threads and lock
+        # to keep batches in order
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Flushes batches of pending writes until closed."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if self._closed:
+                    return None
+
+                # Hold batch until it is due or full, failed batches are held
+                # for their backoff
+                self._cond.wait_for(
+                    lambda: (self._closed
+                             or (not self._backoff
+                                 and len(self._pending) >= self._max_pending)),
+                    max(0, self._due - time.monotonic()))
+                if self._closed:
+                    return None
+
+            try:
+                self.flush()
+            except Exception:
+                # Batch is retried with the next one
+                pass
+
+    def put(self, key, value):
+        """
+        Queues a write of a value, replacing any pending write of the key.
+
+        parameters:
+            key   [object]: key of value written
+            value [object]: value to be written
+        raises:
+            ValueError: raised when writing to a closed queue
+        """
+        with self._cond:
+            if self._closed:
+                raise ValueError('write to closed queue')
+
+            if key in self._pending:
+                self.coalesced += 1
+            elif not self._pending:
+                self._oldest = time.monotonic()
+                self._due = self._oldest + self._interval
+            self._pending[key] = value
+
+            # Wake flushing thread for a new batch or a full one
+            if len(self._pending) in (1, self._max_pending):
+                self._cond.notify_all()
+
+    def get(self, key, default=None):
+        """
+        Retrieves pending value of a key which has not been written yet.
+
+        parameters:
+            key       [object]: key of value
+            default   [object] (default=None): value returned if not pending
+        returns:
+            object: pending value of key, or default
+        """
+        with self._cond:
+            if key in self._pending:
+                return self._pending[key]
+            return self._flushing.get(key, default)
+
+    def flush(self):
+        """
+        Writes all pending values in a single batch. Values of a failed
+        batch stay pending unless they were replaced meanwhile, and are
+        retried after a backoff.
+
+        raises:
+            Exception: raised by the write function
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch = self._pending
+                oldest = self._oldest
+                self._pending = dict()
+                self._flushing = batch
+                self._oldest = None
+                self._due = None
+            if not batch:
+                return None
+
+            start = time.monotonic()
+            try:
+                self._write(batch)
+            except Exception:
+                with self._cond:
+                    self.failures += 1
+
+                    # Restore values not replaced by newer writes and retry
+                    # after a growing backoff
+                    batch.update(self._pending)
+                    self._pending = batch
+                    self._flushing = dict()
+                    self._oldest = oldest
+                    self._backoff = min(
+                        max(self._interval, 2 * self._backoff), MAX_BACKOFF)
+                    self._due = time.monotonic() + self._backoff
+                raise
+
+            end = time.monotonic()
+            with self._cond:
+                self._flushing = dict()
+                self._backoff = 0.0
+                self.flushes += 1
+                self.rows += len(batch)
+                self.latency += SMOOTHING_FACTOR * (
+                    end - start - self.latency)
+                self.max_latency = max(self.max_latency, end - start)
+                self.lag += SMOOTHING_FACTOR * (end - oldest - self.lag)
+
+    def close(self):
+        """
+        Stops background flushing and writes all pending values.
+
+        raises:
+            Exception: raised by the write function
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+        self.flush()
+
+    def stats(self):
+        """
+        Retrieves write statistics of queue.
+
+        returns:
+            dict: pending key count, flush, row, coalesced write and failure
+                  counts, flush latencies and backoff of a failed batch
+        """
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'rows': self.rows,
+                'coalesced': self.coalesced,
+                'failures': self.failures,
+                'latency': self.latency,
+                'max_latency': self.max_latency,
+                'lag': self.lag,
+                'backoff': self._backoff,
+            }
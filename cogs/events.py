@@ -23,6 +23,8 @@ class Events(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
+        # Caches are loaded only once, on_ready also runs after reconnects
+        self._caches_loaded = False
     
     async def _change_presence(self, bot):
         """
@@ -55,12 +57,25 @@ class Events(commands.Cog):
     async def on_ready(self):
         """
         Print out a ready message into python shell and create a rich presense
-        task when bot successfully loads and is online.
+        task when bot successfully loads and is online. Then warm up prefix
+        cache and load users with voice profiles on the first ready event.
         """
         print(f"{self.bot.user.name} logged in")
         print("------------------")
         self.bot.loop.create_task(self._change_presence(self.bot))
 
+        # Reconnects keep the caches already in memory
+        if self._caches_loaded:
+            return None
+        self._caches_loaded = True
+
+        # Preload prefixes of every joined guild
+        await self.bot.prefixes.warm_up(
+            guild.id for guild in self.bot.guilds)
+
+        # Answer lookups of users without voice profiles without queries
+        await self.bot.voice_profiles.load_users()
+
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
         """
@@ -65,7 +65,7 @@ class Info(commands.Cog):
         embed = Embed(
             title=":blue_book: **List of Commands**",
             colour=Colour.blue())
-        prefix = self.prefixes[ctx.guild]
+        prefix = await self.prefixes.fetch_guild(ctx.guild)
 
         # Generate information for voice.py commands
         embed.add_field(
@@ -124,7 +124,7 @@ class Info(commands.Cog):
         """
         # Check if subcommand invoked
         if not ctx.invoked_subcommand:
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
             embed = Embed(
                 title=":book: Voice Directory",
                 description=(f":information_source: **Use** `{prefix}list "
@@ -152,7 +152,7 @@ class Info(commands.Cog):
         """
         # Check if a gender was provided
         if not gender:
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
 
             # Create a string of all the available genders
             genders = "`, `".join(gender for gender in supported_genders)
@@ -218,7 +218,7 @@ class Info(commands.Cog):
         """
         # Check if language was provided
         if not language:
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
 
             # Create a string of all available languages
             languages = "`, `".join(sorted(supported_languages.keys()))
@@ -285,7 +285,7 @@ class Info(commands.Cog):
             ctx     [Context]: context object produced by a command invocation
             error [Exception]: error object thrown by command function
         """
-        prefix = self.prefixes[ctx.guild]
+        prefix = await self.prefixes.fetch_guild(ctx.guild)
 
         embed = Embed(title=":x: **Unsupported Gender**",colour=Colour.red())
 
@@ -308,7 +308,7 @@ class Info(commands.Cog):
             ctx     [Context]: context object produced by a command invocation
             error [Exception]: error object thrown by command function
         """
-        prefix = self.prefixes[ctx.guild]
+        prefix = await self.prefixes.fetch_guild(ctx.guild)
 
         embed = Embed(title=":x: **Unsupported Language**",colour=Colour.red())
 
@@ -39,9 +39,10 @@ class Profiles(commands.Cog):
         # Check if an alias was provided
         if not alias:
             # Retrieve command invoker's current alias
-            alias = self.voice_profiles[(ctx.author, ctx.channel)]
+            key = self.voice_profiles.key(ctx.author, ctx.channel)
+            alias = await self.voice_profiles.fetch(key)
 
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
             embed = Embed(
                 title=":gear: **Voice Settings**",
                 colour=Colour.gold())
@@ -55,7 +56,8 @@ class Profiles(commands.Cog):
                 inline=False)
         elif await voice_is_valid(alias):
             # Set the command invoker's new alias
-            self.voice_profiles[(ctx.author, ctx.channel)] = alias
+            key = self.voice_profiles.key(ctx.author, ctx.channel)
+            self.voice_profiles[key] = alias
             embed = Embed(
                 title=(f":white_check_mark: **{member}'s new voice is **"
                        f"`{alias}`"),
@@ -72,7 +74,7 @@ class Profiles(commands.Cog):
             ctx     [Context]: context object representing command invocation
             error [Exception]: exception object raised from command function
         """
-        prefix = self.prefixes[ctx.guild]
+        prefix = await self.prefixes.fetch_guild(ctx.guild)
 
         embed = Embed(title=":x: **Unable to set voice**",colour=Colour.red())
 
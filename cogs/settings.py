@@ -34,7 +34,7 @@ class Settings(commands.Cog):
         """
         # Check if user invoked a subcommand
         if not ctx.invoked_subcommand:
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
             embed = Embed(
                 title=":gear: **Server Settings**",
                 description=(f":information_source: **Use** `{prefix}settings "
@@ -60,7 +60,7 @@ class Settings(commands.Cog):
         # Check if a prefix was provided
         if not prefix:
             # Retrieve current guild prefix
-            prefix = self.prefixes[ctx.guild]
+            prefix = await self.prefixes.fetch_guild(ctx.guild)
 
             embed = Embed(
                 title=":gear: **Prefix Settings**",
@@ -77,7 +77,7 @@ class Settings(commands.Cog):
 
         elif await prefix_is_valid(prefix):
             # Set the new guild prefix
-            self.prefixes[ctx.guild] = prefix
+            self.prefixes[ctx.guild.id] = prefix
             embed = Embed(
                 title=( ":white_check_mark: **New server prefix is** "
                        f"`{prefix}`"),
@@ -94,7 +94,7 @@ class Settings(commands.Cog):
             ctx     [Context]: context object representing command invocation
             error [Exception]: exception object raised from command function
         """
-        prefix = self.prefixes[ctx.guild]
+        prefix = await self.prefixes.fetch_guild(ctx.guild)
         
         embed = Embed(
             title=":x: **Unable to change prefix**",
@@ -12,7 +12,7 @@ from discord import Embed, Colour
 from discord.ext import commands
 
 from blabber import supported_voices
-from blabber.audio import TTSAudio
+from blabber.audio import TTSAudio, broadcast
 from blabber.checks import *
 from blabber.errors import *
 from blabber.request import TTSRequest
@@ -137,22 +137,72 @@ class Voice(commands.Cog):
             if ctx.voice_client._player:
                 audio = ctx.voice_client._player.source
             else:
-                audio = TTSAudio(self.pool)
+                audio = TTSAudio(self.pool, ctx.voice_client, ctx.guild.id)
 
             # Retrieve command invoker's voice profile
-            alias = self.voice_profiles[(ctx.author, ctx.channel)]
+            key = self.voice_profiles.key(ctx.author, ctx.channel)
+            alias = await self.voice_profiles.fetch(key)
             voice = supported_voices[alias]
 
             # Submit TTS request
             request = TTSRequest(message, **voice)
             await audio.submit_request(request)
 
-            # Ensure AudioSource object is playing
+            # Ensure AudioSource object is playing, parked players having been
+            # resumed on submission
             if not ctx.voice_client.is_playing():
                 ctx.voice_client.play(audio)
 
             await ctx.message.add_reaction('📣')
 
+    @commands.command(name='announce')
+    @commands.is_owner()
+    async def announce(self, ctx, *, message: str=''):
+        """
+        Recites a message into every voice channel Blabber is connected to.
+        The message is synthesized once and shared by all voice channels.
+
+        parameters:
+            ctx [Context]: context object representing command invocation
+            message [str]: message to recite
+        """
+        # Ensure message is not empty
+        if not message:
+            embed = Embed(
+                title=":information_source: **No message to recite**",
+                colour=Colour.blue())
+        elif await tts_message_is_valid(message):
+            # Retrieve AudioSource object of every voice client
+            voice_clients = list(ctx.bot.voice_clients)
+            sources = []
+            for voice_client in voice_clients:
+                if voice_client._player:
+                    sources.append(voice_client._player.source)
+                else:
+                    sources.append(TTSAudio(
+                        self.pool, voice_client, voice_client.guild.id))
+
+            # Retrieve command invoker's voice profile
+            key = self.voice_profiles.key(ctx.author, ctx.channel)
+            alias = await self.voice_profiles.fetch(key)
+            voice = supported_voices[alias]
+
+            # Submit TTS request once for all voice clients
+            request = TTSRequest(message, **voice)
+            await broadcast(self.pool, request, sources)
+
+            # Ensure AudioSource objects are playing
+            for voice_client, audio in zip(voice_clients, sources):
+                if not voice_client.is_playing():
+                    voice_client.play(audio)
+
+            embed = Embed(
+                title=(":white_check_mark: **Announced in** "
+                       f"`{len(sources)}` **voice channels**"),
+                colour=Colour.green())
+
+        await ctx.send(embed=embed)
+
     @connect.error
     async def connect_error(self, ctx, error):
         """
@@ -228,6 +278,30 @@ class Voice(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @announce.error
+    async def announce_error(self, ctx, error):
+        """
+        Local error handler for Blabber's announce command.
+
+        parameters:
+            ctx     [Context]: context object representing command invocation
+            error [Exception]: exception object raised from command function
+        """
+        if isinstance(error, commands.NotOwner):
+            description = "Only the bot owner can make announcements"
+        elif isinstance(error, TTSMessageTooLong):
+            description = f"{error}"
+        else:
+            description = ("**Unexpected Error**\n"
+                           "Please contact development team")
+
+        embed = Embed(
+            title=":x: **Unable to announce**",
+            description=description,
+            colour=Colour.red())
+
+        await ctx.send(embed=embed)
+
 
 def setup(bot):
     """
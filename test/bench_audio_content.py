@@ -0,0 +1,133 @@
+# bench_audio_content.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Microbenchmark of AudioContentDecoder against the per-byte generator it
+# replaced, on a Google Cloud TTS API response for a 600 character message.
+#
+# usage: python test/bench_audio_content.py
+
+import base64
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blabber.pool import AudioContentDecoder
+
+# Size in bytes of Ogg Opus audio synthesized for a 600 character message
+AUDIO_SIZE = 160 * 1024
+
+# Number of timed runs per implementation
+RUNS = 20
+
+
+def _extract_b64_data(data):
+    """
+    Generator used for extracting base64 encoded data from a Google Cloud
+    API response, as previously used by TTSRequestHandler.
+
+    parameters:
+        data [bytes]: chunk of raw response data
+    yields:
+        int: integer representation of a byte of base64 encoded data
+    """
+    quote_count = 0
+    for byte in data:
+        # Count number of times a quote character is read
+        if byte == ord('"'):
+            quote_count += 1
+
+        # Yield data between 3rd and 4th quote character
+        if byte != ord('"') and quote_count == 3:
+            yield byte
+
+
+def decode_generator(lines):
+    """
+    Decodes a response split into lines with the previous generator.
+
+    parameters:
+        lines [list]: lines of raw response data
+    returns:
+        bytes: decoded audio
+    """
+    decoded = []
+    b64_encoded_prefix = bytearray()
+    for chunk in lines:
+        b64_encoded_chunk = (b64_encoded_prefix
+                             + bytes(_extract_b64_data(chunk)))
+
+        # Calculate maximum number of bytes to decode
+        decode_limit = (len(b64_encoded_chunk) // 4) * 4
+
+        # Save remaining bytes to be prefixed to the next chunk
+        b64_encoded_prefix = b64_encoded_chunk[decode_limit:]
+        decoded.append(base64.b64decode(b64_encoded_chunk[:decode_limit]))
+    return b''.join(decoded)
+
+
+def decode_incremental(chunks):
+    """
+    Decodes a response split into chunks with AudioContentDecoder.
+
+    parameters:
+        chunks [list]: chunks of raw response data
+    returns:
+        bytes: decoded audio
+    """
+    decoder = AudioContentDecoder()
+    decoded = [decoder.decode(chunk) for chunk in chunks]
+    assert decoder.is_done()
+    return b''.join(decoded)
+
+
+def split(data, size):
+    """
+    Splits data into chunks of a fixed size.
+
+    parameters:
+        data [bytes]: data to split
+        size   [int]: size of each chunk
+    returns:
+        list: chunks of data
+    """
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def main():
+    random.seed(1)
+    audio = os.urandom(AUDIO_SIZE)
+    response = json.dumps(
+        {'audioContent': base64.b64encode(audio).decode()},
+        indent=2).encode() + b'\n'
+
+    # Both implementations must agree, including on chunks split anywhere
+    lines = response.split(b'\n')
+    assert decode_generator(lines) == audio
+    for _ in range(300):
+        cuts = sorted(random.sample(range(1, len(response)),
+                                    random.randint(1, 50)))
+        chunks = [response[start:stop] for start, stop
+                  in zip([0] + cuts, cuts + [len(response)])]
+        assert decode_incremental(chunks) == audio
+
+    print(f'response: {len(response)} bytes')
+    cases = [
+        ('generator, one chunk per line', decode_generator, lines),
+        ('AudioContentDecoder, 1 MiB chunks', decode_incremental,
+         split(response, 1024 * 1024)),
+        ('AudioContentDecoder, 8 KiB chunks', decode_incremental,
+         split(response, 8 * 1024)),
+    ]
+    for name, decode, chunks in cases:
+        elapsed = timeit.timeit(lambda: decode(chunks), number=RUNS) / RUNS
+        print(f'{name:36s} {elapsed * 1e3:8.3f} ms/response')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# bench_cache_memory.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Memory benchmark of a voice profile cache holding 100k entries, keyed by
+# packed integer IDs with interned aliases against the (User, Channel) keys
+# and per row alias strings it previously held. Memory is measured with
+# tracemalloc.
+#
+# usage: python test/bench_cache_memory.py
+
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cachetools import TTLCache
+from discord import Object, User
+
+from blabber.cache import VoiceProfileCache
+
+# Number of cached voice profiles
+ENTRY_COUNT = 100000
+
+# Number of distinct voice aliases in use
+ALIAS_COUNT = 40
+
+
+def _user(user_id):
+    """
+    Creates a discord User as the gateway would for a message author.
+
+    parameters:
+        user_id [int]: ID of discord User
+    returns:
+        User: discord User object
+    """
+    return User(state=None, data={'username': f'user{user_id}',
+                                  'id': user_id,
+                                  'discriminator': '0001',
+                                  'avatar': None})
+
+
+def _row_alias(aliases, rng):
+    """
+    Creates a new string for an alias, as read from a database row.
+
+    parameters:
+        aliases [list]: names of voice aliases
+        rng   [Random]: random number generator
+    returns:
+        str: name of voice alias
+    """
+    return ''.join(rng.choice(aliases))
+
+
+def build_object_keys(ids, aliases, rng):
+    """
+    Builds a cache keyed by tuples of discord User and Channel objects.
+
+    parameters:
+        ids     [list]: pairs of user and channel IDs
+        aliases [list]: names of voice aliases
+        rng   [Random]: random number generator
+    returns:
+        TTLCache: filled cache
+    """
+    cache = TTLCache(maxsize=len(ids), ttl=3600)
+    for user_id, channel_id in ids:
+        cache[(_user(user_id), Object(channel_id))] = _row_alias(aliases, rng)
+    return cache
+
+
+def build_packed_keys(ids, aliases, rng):
+    """
+    Builds a VoiceProfileCache keyed by packed IDs, storing entries as a
+    database read would without writing them through.
+
+    parameters:
+        ids     [list]: pairs of user and channel IDs
+        aliases [list]: names of voice aliases
+        rng   [Random]: random number generator
+    returns:
+        VoiceProfileCache: filled cache
+    """
+    cache = VoiceProfileCache(max_size=len(ids))
+    for user_id, channel_id in ids:
+        key = VoiceProfileCache.key(Object(user_id), Object(channel_id))
+        TTLCache.__setitem__(cache, key,
+                             sys.intern(_row_alias(aliases, rng)))
+    return cache
+
+
+def measure(build, *args):
+    """
+    Measures memory allocated by a cache while it is built.
+
+    parameters:
+        build [callable]: function building the cache
+        args      [list]: arguments of build
+    returns:
+        float: allocated memory in MB
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        cache = build(*args)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(cache) == ENTRY_COUNT
+    return size / 1e6
+
+
+def main():
+    rng = random.Random(0)
+    aliases = [f'english_{index}' for index in range(ALIAS_COUNT)]
+    ids = [(rng.getrandbits(63), rng.getrandbits(63))
+           for _ in range(ENTRY_COUNT)]
+
+    object_keys = measure(build_object_keys, ids, aliases, rng)
+    packed_keys = measure(build_packed_keys, ids, aliases, rng)
+    print(f'{ENTRY_COUNT} entries, {ALIAS_COUNT} aliases')
+    print(f'{"(User, Channel) keys":36s} {object_keys:8.1f} MB')
+    print(f'{"packed int keys, interned aliases":36s} {packed_keys:8.1f} MB '
+          f'({object_keys / packed_keys:.1f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# bench_cache_policy.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Replay benchmark of the 'lru' and 'tinylfu' database cache policies. Each
+# trace is replayed through a cache of the default voice profile cache size,
+# reporting hit rates and time per lookup. Synthetic traces are generated by
+# cachetraces.py unless trace files are given.
+#
+# usage: python test/bench_cache_policy.py [trace file ...]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blabber.cache import DatabaseCache
+from cachetraces import TRACES, load_trace
+
+# Number of entries of the replayed caches
+CACHE_SIZE = 512
+
+# Admission policies compared
+POLICIES = ('lru', 'tinylfu')
+
+
+class ReplayCache(DatabaseCache):
+    """
+    Database cache answering every read with the key itself, counting reads
+    as misses.
+
+    parameters:
+        max_size [int]: maximum size of cache
+        policy   [str]: admission policy, either 'lru' or 'tinylfu'
+    attributes:
+        misses [int]: number of values read from the database
+    """
+    def __init__(self, max_size, policy):
+        super().__init__(max_size, time_to_live=1 << 30, policy=policy)
+        self.misses = 0
+
+    def _load(self, key):
+        self.misses += 1
+        return key
+
+    def __missing__(self, key):
+        value = self._load(key)
+        self._store(key, value)
+        return value
+
+
+def replay(trace, policy):
+    """
+    Replays a trace through a cache.
+
+    parameters:
+        trace [list]: accessed keys
+        policy [str]: admission policy
+    returns:
+        tuple: hit rate and time per lookup in secs
+    """
+    cache = ReplayCache(CACHE_SIZE, policy)
+    start = time.perf_counter()
+    for key in trace:
+        cache[key]
+    elapsed = time.perf_counter() - start
+    return 1 - cache.misses / len(trace), elapsed / len(trace)
+
+
+def main():
+    if len(sys.argv) > 1:
+        traces = [(os.path.basename(path), load_trace(path))
+                  for path in sys.argv[1:]]
+    else:
+        traces = [(name, generate(rng=random.Random(42)))
+                  for name, generate in TRACES.items()]
+
+    print(f'{CACHE_SIZE} entries, hit rate (time per lookup)')
+    for name, trace in traces:
+        results = []
+        for policy in POLICIES:
+            hit_rate, lookup_time = replay(trace, policy)
+            results.append(f'{policy} {hit_rate * 100:5.1f}% '
+                           f'({lookup_time * 1e6:4.1f} us)')
+        print(f'{name:12s} ' + ' | '.join(results))
+
+
+if __name__ == '__main__':
+    main()
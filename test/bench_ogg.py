@@ -0,0 +1,99 @@
+# bench_ogg.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Benchmark of OggDemuxer against discord.py's OggStream, both reading Opus
+# packets of synthesized audio through a SimplexReader.
+#
+# usage: python test/bench_ogg.py
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.oggparse import OggStream
+
+from blabber.ogg import OggDemuxer
+from blabber.stream import SimplexIOBase, SimplexReader, SimplexWriter
+from oggcorpus import make_ogg, random_packets
+
+# Number of Opus packets in a minute of audio, 20 ms each
+PACKET_COUNT = 3000
+
+# Number of timed runs per parser, the best of which is reported
+RUNS = 7
+
+
+def _reader(chunks):
+    """
+    Creates a read accessor holding chunks of an Ogg stream.
+
+    parameters:
+        chunks [list]: chunks of Ogg stream
+    returns:
+        SimplexReader: read accessor at start of stream
+    """
+    io_base = SimplexIOBase(max_buffered=1 << 30)
+    reader = SimplexReader(io_base)
+    writer = SimplexWriter(io_base)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+    return reader
+
+
+def parse_oggstream(chunks):
+    """
+    Reads every packet with OggStream.
+
+    parameters:
+        chunks [list]: chunks of Ogg stream
+    returns:
+        int: number of packets read
+    """
+    return sum(1 for _ in OggStream(_reader(chunks)).iter_packets())
+
+
+def parse_demuxer(chunks):
+    """
+    Reads every packet with OggDemuxer.
+
+    parameters:
+        chunks [list]: chunks of Ogg stream
+    returns:
+        int: number of packets read
+    """
+    return sum(1 for _ in OggDemuxer().iter_packets(_reader(chunks)))
+
+
+def main():
+    random.seed(5)
+    cases = [
+        ('speech packets, 1 MiB chunks',
+         [os.urandom(random.randint(60, 160)) for _ in range(PACKET_COUNT)],
+         1024 * 1024),
+        ('random packets, 64 KiB chunks',
+         random_packets(PACKET_COUNT), 64 * 1024),
+    ]
+    for name, packets, chunk_size in cases:
+        ogg = make_ogg(packets)
+        chunks = [ogg[start:start + chunk_size]
+                  for start in range(0, len(ogg), chunk_size)]
+        assert parse_oggstream(chunks) == parse_demuxer(chunks) \
+            == len(packets)
+
+        print(name)
+        for parser, parse in (('OggStream', parse_oggstream),
+                              ('OggDemuxer', parse_demuxer)):
+            elapsed = min(timeit.repeat(
+                lambda: parse(chunks), number=1, repeat=RUNS))
+            print(f'  {parser:10s} {elapsed / len(packets) * 1e6:6.2f} '
+                  f'us/packet')
+
+
+if __name__ == '__main__':
+    main()
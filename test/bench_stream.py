@@ -0,0 +1,120 @@
+# bench_stream.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Benchmark of SimplexReader's chunk buffer against the concatenating buffer
+# it replaced, read with discord.py OggStream's small-read access pattern.
+#
+# usage: python test/bench_stream.py
+
+import os
+import random
+import sys
+import timeit
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.oggparse import OggStream
+
+from blabber.stream import SimplexIOBase, SimplexReader, SimplexWriter
+from oggcorpus import make_ogg, random_packets
+
+# Size in bytes of chunks written by handlers
+CHUNK_SIZE = 8 * 1024
+
+# Number of timed runs per buffer
+RUNS = 5
+
+
+class ConcatReader():
+    """
+    Reader buffering written chunks the way SimplexReader previously did.
+    Once the buffer runs short, every chunk written so far is concatenated
+    onto it, and the remaining bytes are sliced off on every read.
+
+    parameters:
+        chunks [list]: chunks of data written
+    """
+    def __init__(self, chunks):
+        self._chunks = deque(chunks)
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        """
+        Reads at most 'size' bytes.
+
+        parameters:
+            size [int] (default=-1): number of bytes to read
+        returns:
+            bytes: oldest unread data
+        """
+        if size < 0 or len(self._buffer) < size:
+            while self._chunks:
+                self._buffer += self._chunks.popleft()
+
+        if size < 0 or len(self._buffer) <= size:
+            data = self._buffer
+            self._buffer = bytearray()
+        else:
+            # Save remaining bytes to buffer
+            data = self._buffer[:size]
+            self._buffer = self._buffer[size:]
+        return bytes(data)
+
+
+def parse_concat(chunks):
+    """
+    Parses chunks with OggStream through the concatenating buffer.
+
+    parameters:
+        chunks [list]: chunks of Ogg stream
+    returns:
+        int: number of packets parsed
+    """
+    return sum(1 for _ in OggStream(ConcatReader(chunks)).iter_packets())
+
+
+def parse_chunked(chunks):
+    """
+    Parses chunks with OggStream through a SimplexReader.
+
+    parameters:
+        chunks [list]: chunks of Ogg stream
+    returns:
+        int: number of packets parsed
+    """
+    io_base = SimplexIOBase(max_buffered=1 << 30)
+    reader = SimplexReader(io_base)
+    writer = SimplexWriter(io_base)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+    return sum(1 for _ in OggStream(reader).iter_packets())
+
+
+def main():
+    random.seed(3)
+    for max_segments in (255, 50, 4):
+        for seconds in (10, 40, 120):
+            # One packet per 20 ms frame
+            packets = random_packets(seconds * 50)
+            ogg = make_ogg(packets, max_segments)
+            chunks = [ogg[start:start + CHUNK_SIZE]
+                      for start in range(0, len(ogg), CHUNK_SIZE)]
+            assert parse_concat(chunks) == parse_chunked(chunks) \
+                == len(packets)
+
+            concat = timeit.timeit(
+                lambda: parse_concat(chunks), number=RUNS) / RUNS
+            chunked = timeit.timeit(
+                lambda: parse_chunked(chunks), number=RUNS) / RUNS
+            print(f'{max_segments:3d} segments/page {seconds:4d} s audio '
+                  f'{len(ogg) // 1024:6d} KiB  concat {concat * 1e3:8.1f} ms'
+                  f'  chunked {chunked * 1e3:6.1f} ms'
+                  f'  {concat / chunked:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
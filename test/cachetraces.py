@@ -0,0 +1,138 @@
+# cachetraces.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Generators of synthetic cache access traces shared by tests and benchmarks,
+# since no recorded traces of the bot exist. Traces are lists of integer keys
+# and may be saved with one key per line.
+#
+# usage: python test/cachetraces.py <bursty|zipf|loop|shift> <file>
+
+import random
+import sys
+
+# Number of accesses per trace
+TRACE_LENGTH = 200000
+
+
+def zipf_keys(count, key_count, skew, rng=random):
+    """
+    Generates keys whose popularity follows a Zipf distribution.
+
+    parameters:
+        count     [int]: number of keys generated
+        key_count [int]: number of distinct keys
+        skew    [float]: Zipf exponent, higher favors popular keys more
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: keys from 0 up to key_count, most popular first
+    """
+    weights = [1 / (rank + 1) ** skew for rank in range(key_count)]
+    return rng.choices(range(key_count), weights=weights, k=count)
+
+
+def bursty_trace(count=TRACE_LENGTH, rng=random):
+    """
+    Generates accesses of regular users, interrupted by bursts of one-off
+    users making up a fifth of all accesses.
+
+    parameters:
+        count [int] (default=TRACE_LENGTH): number of accesses
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: accessed keys
+    """
+    regular = iter(zipf_keys(count, 5000, 0.9, rng))
+    one_off = 1 << 32
+    trace = []
+    for step in range(count):
+        if step % 2000 < 400:
+            one_off += 1
+            trace.append(one_off)
+        else:
+            trace.append(next(regular))
+    return trace
+
+
+def zipf_trace(count=TRACE_LENGTH, rng=random):
+    """
+    Generates accesses of a large population with a long tail.
+
+    parameters:
+        count [int] (default=TRACE_LENGTH): number of accesses
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: accessed keys
+    """
+    return zipf_keys(count, 20000, 0.8, rng)
+
+
+def loop_trace(count=TRACE_LENGTH, rng=random):
+    """
+    Generates accesses cycling through slightly more keys than the default
+    cache size, which defeats least recently used eviction.
+
+    parameters:
+        count [int] (default=TRACE_LENGTH): number of accesses
+        rng [Random] (default=random): unused, accepted for symmetry
+    returns:
+        list: accessed keys
+    """
+    return [step % 700 for step in range(count)]
+
+
+def shift_trace(count=TRACE_LENGTH, rng=random):
+    """
+    Generates accesses whose popular keys change halfway through.
+
+    parameters:
+        count [int] (default=TRACE_LENGTH): number of accesses
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: accessed keys
+    """
+    half = count // 2
+    return (zipf_keys(half, 5000, 0.9, rng)
+            + [key + 5000 for key in zipf_keys(count - half, 5000, 0.9, rng)])
+
+
+# Trace generators keyed by name
+TRACES = {
+    'bursty': bursty_trace,
+    'zipf': zipf_trace,
+    'loop': loop_trace,
+    'shift': shift_trace,
+}
+
+
+def save_trace(trace, path):
+    """
+    Saves a trace with one key per line.
+
+    parameters:
+        trace [list]: accessed keys
+        path   [str]: path of trace file
+    """
+    with open(path, 'w') as trace_file:
+        trace_file.write('\n'.join(map(str, trace)) + '\n')
+
+
+def load_trace(path):
+    """
+    Loads a trace saved with one key per line.
+
+    parameters:
+        path [str]: path of trace file
+    returns:
+        list: accessed keys
+    """
+    with open(path) as trace_file:
+        return [int(line) for line in trace_file if line.strip()]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in TRACES:
+        sys.exit('usage: python test/cachetraces.py '
+                 '<bursty|zipf|loop|shift> <file>')
+    save_trace(TRACES[sys.argv[1]](rng=random.Random(42)), sys.argv[2])
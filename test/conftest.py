@@ -0,0 +1,11 @@
+# conftest.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import os
+import sys
+
+# Make the blabber package importable when pytest runs from the repository
+# root, which blabber expects as working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
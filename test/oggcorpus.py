@@ -0,0 +1,82 @@
+# oggcorpus.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+#
+# Generators of synthetic Ogg Opus streams shared by tests and benchmarks.
+
+import os
+import random
+import struct
+
+# Ogg page header following the magic: version, header type, granule
+# position, serial number, page sequence number, checksum and segment count
+PAGE_HEADER = struct.Struct('<BBQIIIB')
+
+# Sizes in bytes of Opus packets produced for 20 ms frames, including the
+# tiny packets of silence and the large ones only split across pages
+PACKET_SIZES = (3, 60, 120, 160, 300, 600)
+
+
+def random_packets(count, rng=random):
+    """
+    Generates random Opus packets.
+
+    parameters:
+        count [int]: number of packets
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: packets of random sizes and contents
+    """
+    return [os.urandom(rng.choice(PACKET_SIZES)) for _ in range(count)]
+
+
+def make_ogg(packets, max_segments=255, serial=1):
+    """
+    Builds an Ogg stream holding packets. Packets are laced into segments
+    and pages are cut every 'max_segments' segments, so packets may continue
+    across pages.
+
+    parameters:
+        packets [list]: packets to be stored
+        max_segments [int] (default=255): maximum segment count of a page
+        serial [int] (default=1): serial number of logical stream
+    returns:
+        bytes: Ogg stream
+    """
+    segments = []
+    for packet in packets:
+        lacing = [255] * (len(packet) // 255) + [len(packet) % 255]
+        offset = 0
+        for value in lacing:
+            segments.append((value, packet[offset:offset + value]))
+            offset += value
+
+    stream = bytearray()
+    for sequence, start in enumerate(range(0, len(segments), max_segments)):
+        page = segments[start:start + max_segments]
+        stream += b'OggS'
+        stream += PAGE_HEADER.pack(0, 0, 0, serial, sequence, 0, len(page))
+        stream += bytes(value for value, _ in page)
+        stream += b''.join(data for _, data in page)
+    return bytes(stream)
+
+
+def split(data, sizes, rng=random):
+    """
+    Splits data into chunks of random sizes.
+
+    parameters:
+        data [bytes]: data to split
+        sizes [tuple]: inclusive bounds on chunk size
+        rng [Random] (default=random): source of randomness
+    returns:
+        list: chunks of data
+    """
+    chunks = []
+    start = 0
+    while start < len(data):
+        stop = start + rng.randint(*sizes)
+        chunks.append(data[start:stop])
+        start = stop
+    return chunks
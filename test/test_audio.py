@@ -0,0 +1,213 @@
+# test_audio.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('discord')
+
+from discord.player import AudioPlayer
+
+from blabber.audio import SILENCE_FRAME, TTSAudio, broadcast
+from blabber.ogg import PacketTable
+from blabber.request import TTSRequest, TTSRequestDispatcher
+from blabber.stream import SimplexWriter
+from oggcorpus import make_ogg, random_packets
+
+
+class _Pool():
+    """
+    Handler pool answering every TTS request job at once, either with a
+    cached packet table or with Ogg audio it then caches.
+    """
+    def __init__(self, packets, cached=False, caching=True):
+        self.table = PacketTable.from_packets(packets)
+        self.ogg = make_ogg(packets)
+        self.cached = cached
+        self.caching = caching
+
+    def submit_job(self, job, key=None):
+        request, istream = job
+        istream.write(self.table if self.cached else self.ogg, block=False)
+        istream.close()
+        if self.caching:
+            self.cached = True
+
+    def cached_audio(self, request):
+        return self.table if self.cached else None
+
+
+class _Source():
+    """Audio source recording submitted audio."""
+    def __init__(self):
+        self.audio = []
+
+    async def submit_audio(self, audio):
+        self.audio.append(audio)
+
+
+def _broadcast(pool, count=3):
+    """
+    Broadcasts a TTS request to audio sources.
+
+    parameters:
+        pool [_Pool]: handler pool
+        count [int] (default=3): number of audio sources
+    returns:
+        tuple: broadcast packet table and audio submitted to each source
+    """
+    sources = [_Source() for _ in range(count)]
+    audio = asyncio.run(broadcast(pool, TTSRequest('hello'), sources))
+    return audio, [source.audio for source in sources]
+
+
+def test_broadcast_shares_cached_table():
+    pool = _Pool(random_packets(50), cached=True)
+    audio, submitted = _broadcast(pool)
+
+    assert audio is pool.table
+    assert all(len(sent) == 1 and sent[0] is audio for sent in submitted)
+
+
+def test_broadcast_shares_table_cached_by_handler():
+    pool = _Pool(random_packets(50))
+    audio, submitted = _broadcast(pool)
+
+    assert audio is pool.table
+    assert all(sent[0] is audio for sent in submitted)
+
+
+def test_broadcast_parses_audio_not_cached():
+    packets = random_packets(50)
+    pool = _Pool(packets, caching=False)
+    audio, submitted = _broadcast(pool)
+
+    assert [bytes(packet) for packet in audio] == packets
+    assert all(sent[0] is audio for sent in submitted)
+
+
+def test_read_audio_returns_written_table():
+    pool = _Pool(random_packets(50), cached=True)
+    dispatch = TTSRequestDispatcher(pool)
+    asyncio.run(dispatch.submit_request(TTSRequest('hello')))
+
+    assert dispatch.read_audio() is pool.table
+
+
+class _VoiceClient():
+    """
+    Voice client recording sent packets and speaking state updates, whose
+    websocket calls run on an event loop in another thread.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+        self._connected = threading.Event()
+        self._connected.set()
+        self._player = None
+        self.ws = self
+        self.packets = []
+        self.speaking = []
+
+    def send_audio_packet(self, data, encode=True):
+        self.packets.append(data)
+
+    async def speak(self, speaking):
+        self.speaking.append(speaking)
+
+    def pause(self):
+        self._player.pause()
+
+    def resume(self):
+        self._player.resume()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def test_speaking_state_is_kept_between_messages():
+    client = _VoiceClient()
+    audio = TTSAudio(None, client)
+    client._player = AudioPlayer(audio, client)
+    client._player.start()
+
+    table = PacketTable.from_packets(random_packets(5))
+    for _ in range(3):
+        asyncio.run(audio.submit_audio(table))
+
+        # Wait for the audio player to park once the message was played
+        deadline = time.monotonic() + 2
+        while not client._player.is_paused():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    client._player.stop()
+    client._player.join()
+    client.close()
+
+    assert client.speaking == [True, False]
+    assert sum(packet != SILENCE_FRAME for packet in client.packets) == 15
+
+
+def test_prefetcher_restarts_after_unexpected_error():
+    audio = TTSAudio(None, SimpleNamespace(_player=None))
+    iter_packets = audio._dispatch.iter_packets
+    failures = [RuntimeError('dispatcher failed')]
+
+    def fail_once():
+        if failures:
+            raise failures.pop()
+        return iter_packets()
+
+    audio._dispatch.iter_packets = fail_once
+    table = PacketTable.from_packets(random_packets(5))
+    asyncio.run(audio.submit_audio(table))
+    deadline = time.monotonic() + 1
+    while audio._prefetcher is not None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    # Next submission starts another prefetcher for all pending audio
+    asyncio.run(audio.submit_audio(table))
+    packets = []
+    deadline = time.monotonic() + 1
+    while len(packets) < 10:
+        assert time.monotonic() < deadline
+        packet = audio.read()
+        if packet != SILENCE_FRAME:
+            packets.append(bytes(packet))
+        time.sleep(0.001)
+    audio.cleanup()
+
+    assert packets == 2 * [bytes(packet) for packet in table]
+
+
+def test_buffer_limit_is_configurable():
+    audio = TTSAudio(None, SimpleNamespace(_player=None), max_buffered=64)
+    audio.clear()
+    dispatch = audio._dispatch
+    istream = SimplexWriter(dispatch._io_base)
+
+    # Second write is held back until the first one is read
+    writer = threading.Thread(
+        target=lambda: [istream.write(bytes(64)) for _ in range(2)])
+    writer.start()
+    writer.join(0.1)
+    assert writer.is_alive()
+
+    assert len(dispatch._ostream.read(64)) == 64
+    writer.join(1)
+    assert not writer.is_alive()
+    istream.close()
+    audio.cleanup()
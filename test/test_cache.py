@@ -0,0 +1,147 @@
+# test_cache.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('discord')
+pytest.importorskip('dotenv')
+pytest.importorskip('mysql.connector')
+
+from blabber.cache import AudioCache, DatabaseCache
+from blabber.diskcache import DiskAudioCache
+from blabber.ogg import PacketTable
+
+# Time in secs a slow disk write holds the disk tier's lock
+DISK_DELAY = 0.5
+
+
+class _Cache(DatabaseCache):
+    """
+    Database cache whose values are read from a dict, counting reads. Reads
+    wait for the release event to be set.
+    """
+    def __init__(self, max_size, policy='lru'):
+        super().__init__(max_size, time_to_live=3600, policy=policy)
+        self.rows = dict()
+        self.loads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def _load(self, key):
+        self.release.wait(1)
+        self.loads += 1
+        return self.rows.get(key, 'default')
+
+    def __missing__(self, key):
+        value = self._load(key)
+        self._store(key, value)
+        return value
+
+
+def test_links_start_with_least_recently_used_key():
+    # _admit relies on cachetools keeping TTL links in LRU order
+    cache = _Cache(3)
+    for key in ('a', 'b', 'c'):
+        cache[key]
+    cache['a']
+
+    assert next(iter(cache._TTLCache__links)) == 'b'
+    cache['d']
+    assert 'b' not in cache
+
+
+def test_tinylfu_keeps_frequent_keys_through_one_off_keys():
+    cache = _Cache(4, policy='tinylfu')
+    for _ in range(5):
+        for key in range(4):
+            cache[key]
+
+    for key in range(100, 200):
+        cache[key]
+
+    assert sorted(cache) == [0, 1, 2, 3]
+    assert cache.rejected == 100
+
+
+def test_fetch_shares_query():
+    async def main():
+        cache = _Cache(4)
+        cache.rows['a'] = 'x'
+        cache.release.clear()
+        lookups = [asyncio.ensure_future(cache.fetch('a')) for _ in range(3)]
+        await asyncio.sleep(0)
+        cache.release.set()
+        return cache, await asyncio.gather(*lookups)
+
+    cache, values = asyncio.run(main())
+    assert values == ['x', 'x', 'x']
+    assert cache.loads == 1
+    assert cache.suppressed == 2
+
+
+def test_fetch_records_access_once_when_key_is_set_during_query():
+    async def main():
+        cache = _Cache(4, policy='tinylfu')
+        cache.release.clear()
+        lookup = asyncio.ensure_future(cache.fetch('a'))
+        await asyncio.sleep(0)
+
+        # Value set by a command while the database is read
+        DatabaseCache.__setitem__(cache, 'a', 'x')
+        cache.release.set()
+        return cache, await lookup
+
+    cache, value = asyncio.run(main())
+    assert value == 'x'
+    assert cache._sketch.estimate('a') == 1
+
+
+class _SlowDiskCache(DiskAudioCache):
+    """
+    Disk audio cache whose writes hold its lock for DISK_DELAY secs.
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self.writing = threading.Event()
+
+    def _append(self, digest, value):
+        self.writing.set()
+        time.sleep(DISK_DELAY)
+        super()._append(digest, value)
+
+
+def _request(fingerprint):
+    return SimpleNamespace(fingerprint=lambda: fingerprint)
+
+
+def test_memory_lookup_does_not_wait_on_disk_io(tmp_path):
+    disk = _SlowDiskCache(str(tmp_path))
+    cache = AudioCache(disk=disk)
+    cached = _request('cached')
+    cache.store(cached, PacketTable.from_packets([b'cached']))
+
+    # Slow write holds the disk lock, a full lookup waits on it
+    writer = threading.Thread(target=cache.store, args=(
+        _request('written'), PacketTable.from_packets([b'written'])))
+    writer.start()
+    assert disk.writing.wait(1)
+    reader = threading.Thread(target=cache.lookup, args=(_request('miss'),))
+    reader.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    assert cache.lookup(cached, disk=False) is not None
+    assert cache.lookup(_request('miss'), disk=False) is None
+    elapsed = time.perf_counter() - start
+
+    writer.join()
+    reader.join()
+    disk.close()
+    assert elapsed < DISK_DELAY / 2
@@ -0,0 +1,118 @@
+# test_ogg.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import io
+import os
+import random
+
+import pytest
+
+pytest.importorskip('discord')
+
+from discord.oggparse import OggError, OggStream
+
+from blabber.ogg import OggDemuxer, PacketTable
+from blabber.stream import SimplexIOBase, SimplexReader, SimplexWriter
+from oggcorpus import make_ogg, split
+
+# Number of random streams in the corpus
+CORPUS_SIZE = 300
+
+# Inclusive bounds on chunk sizes streams are fed in
+CHUNK_SIZES = ((1, 1), (1, 64), (1, 4096), (4096, 65536))
+
+
+def _corpus_stream(seed):
+    """
+    Generates a random Ogg stream of the corpus. Packets range from empty to
+    spanning several pages, including sizes laced with a trailing zero.
+
+    parameters:
+        seed [int]: seed of stream
+    returns:
+        tuple: Ogg stream and chunks it is split into
+    """
+    rng = random.Random(seed)
+    sizes = [rng.choice((0, 255, 510, rng.randint(1, 1300)))
+             for _ in range(rng.randint(1, 60))]
+    ogg = make_ogg([os.urandom(size) for size in sizes],
+                   max_segments=rng.randint(1, 255))
+    return ogg, split(ogg, rng.choice(CHUNK_SIZES), rng)
+
+
+def _oggstream_packets(ogg):
+    """
+    Parses an Ogg stream with discord.py's parser.
+
+    parameters:
+        ogg [bytes]: Ogg stream
+    returns:
+        list: packets of stream
+    """
+    return list(OggStream(io.BytesIO(ogg)).iter_packets())
+
+
+@pytest.mark.parametrize('seed', range(CORPUS_SIZE))
+def test_feed_matches_oggstream(seed):
+    ogg, chunks = _corpus_stream(seed)
+
+    demuxer = OggDemuxer()
+    packets = [bytes(packet)
+               for chunk in chunks for packet in demuxer.feed(chunk)]
+
+    assert packets == _oggstream_packets(ogg)
+
+
+@pytest.mark.parametrize('seed', range(0, CORPUS_SIZE, 10))
+def test_iter_packets_matches_oggstream(seed):
+    ogg, chunks = _corpus_stream(seed)
+
+    io_base = SimplexIOBase(max_buffered=len(ogg) + 1)
+    reader = SimplexReader(io_base)
+    writer = SimplexWriter(io_base)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+
+    packets = [bytes(packet) for packet in OggDemuxer().iter_packets(reader)]
+
+    assert packets == _oggstream_packets(ogg)
+
+
+@pytest.mark.parametrize('seed', range(0, CORPUS_SIZE, 10))
+def test_packet_table_matches_oggstream(seed):
+    ogg, _ = _corpus_stream(seed)
+
+    table = PacketTable.from_ogg(ogg)
+    restored = PacketTable.from_buffer(table.to_bytes())
+
+    expected = _oggstream_packets(ogg)
+    assert [bytes(packet) for packet in table] == expected
+    assert [bytes(packet) for packet in restored] == expected
+
+
+def test_feed_rejects_invalid_magic():
+    ogg = make_ogg([b'Opus'])
+    corrupt = b'OggX' + ogg[4:]
+
+    with pytest.raises(OggError):
+        list(OggDemuxer().feed(corrupt))
+    with pytest.raises(OggError):
+        _oggstream_packets(corrupt)
+
+
+def test_iter_packets_drops_page_cut_off_at_eof():
+    complete = make_ogg([b'first'])
+    cut_off = make_ogg([b'second'])[:-1]
+
+    io_base = SimplexIOBase()
+    reader = SimplexReader(io_base)
+    writer = SimplexWriter(io_base)
+    writer.write(complete + cut_off)
+    writer.close()
+
+    packets = [bytes(packet) for packet in OggDemuxer().iter_packets(reader)]
+
+    assert packets == [b'first']
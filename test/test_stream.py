@@ -0,0 +1,162 @@
+# test_stream.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import statistics
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('discord')
+
+from blabber.stream import SimplexIOBase, SimplexReader, SimplexWriter
+
+# Number of wake-ups measured per test
+TRIALS = 20
+
+# Factor by which the median wake-up latency of a stream may exceed that of
+# a bare thread hand-off measured in the same run
+LATENCY_RATIO = 10
+
+
+class _EventReader():
+    """
+    Reader blocking on a threading.Event, used to measure the wake-up latency
+    of a bare thread hand-off on the machine running the tests.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+
+    def read(self, size):
+        self.event.wait()
+        return b'Opus'[:size]
+
+
+def _wake_up_latency(reader, release):
+    """
+    Measures time taken by a read blocked on an empty stream to return once
+    another thread releases it.
+
+    parameters:
+        reader [SimplexReader]: read accessor blocking on a read of 4 bytes
+        release    [callable]: function writing data or closing writers
+    returns:
+        tuple: wake-up latency in secs and data read
+    """
+    result = []
+
+    def read():
+        data = reader.read(4)
+        result.append((time.perf_counter(), bytes(data)))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+
+    # Reader must be blocked before it is released
+    time.sleep(0.005)
+    assert thread.is_alive()
+
+    released = time.perf_counter()
+    release()
+    thread.join(1)
+    assert not thread.is_alive()
+
+    woke, data = result[0]
+    return woke - released, data
+
+
+def _compare_wake_up(release, expected):
+    """
+    Measures wake-up latency of reads on a stream released by a function,
+    interleaved with bare thread hand-offs so both see the same load.
+
+    parameters:
+        release [callable]: function taking a write accessor and releasing
+                            the reader
+        expected   [bytes]: data read once released
+    returns:
+        tuple: median wake-up latency of stream and of thread hand-off
+    """
+    latencies = []
+    baseline = []
+    for _ in range(TRIALS):
+        io_base = SimplexIOBase()
+        reader = SimplexReader(io_base)
+        writer = SimplexWriter(io_base)
+
+        latency, data = _wake_up_latency(reader, lambda: release(writer))
+        assert data == expected
+        latencies.append(latency)
+
+        event_reader = _EventReader()
+        latency, _ = _wake_up_latency(event_reader, event_reader.event.set)
+        baseline.append(latency)
+
+    return statistics.median(latencies), statistics.median(baseline)
+
+
+def test_read_wakes_up_on_write():
+    latency, baseline = _compare_wake_up(
+        lambda writer: writer.write(b'Opus'), b'Opus')
+    assert latency < LATENCY_RATIO * baseline
+
+
+def test_read_wakes_up_at_eof():
+    latency, baseline = _compare_wake_up(lambda writer: writer.close(), b'')
+    assert latency < LATENCY_RATIO * baseline
+
+
+def test_read_gathers_writes_in_writer_order():
+    io_base = SimplexIOBase()
+    reader = SimplexReader(io_base)
+    first = SimplexWriter(io_base)
+    second = SimplexWriter(io_base)
+
+    # Later writer completes first without waiting on the earlier one
+    second.write(b'world')
+    second.close()
+    first.write(b'hello ')
+    first.close()
+
+    assert bytes(reader.read()) == b'hello world'
+
+
+def test_buffer_limit_covers_all_segments():
+    io_base = SimplexIOBase(max_buffered=100)
+    reader = SimplexReader(io_base)
+    first = SimplexWriter(io_base)
+    second = SimplexWriter(io_base)
+    third = SimplexWriter(io_base)
+
+    # Segments waiting to be read share the buffer limit
+    second.write(b'x' * 100)
+    blocked = threading.Thread(target=third.write, args=(b'z',))
+    blocked.start()
+    blocked.join(0.05)
+    assert blocked.is_alive()
+
+    # Segment being read is never held back by later segments
+    first.write(b'y' * 50)
+    assert bytes(reader.read(50)) == b'y' * 50
+    first.close()
+
+    # Reading the next segment frees space for the held back writer
+    assert bytes(reader.read(10)) == b'x' * 10
+    blocked.join(1)
+    assert not blocked.is_alive()
+
+
+def test_non_blocking_write_ignores_buffer_limit():
+    io_base = SimplexIOBase(max_buffered=10)
+    reader = SimplexReader(io_base)
+    first = SimplexWriter(io_base)
+    second = SimplexWriter(io_base)
+
+    second.write(b'x' * 10)
+    second.write(b'y' * 10, block=False)
+    second.close()
+    first.close()
+
+    assert bytes(reader.read()) == b'x' * 10 + b'y' * 10
@@ -0,0 +1,60 @@
+# test_writebehind.py
+#
+# Python Version: 3.8.1
+# License: MIT License
+
+import threading
+import time
+
+from blabber.writebehind import WriteBehindQueue
+
+
+def test_failed_full_batch_backs_off():
+    calls = []
+
+    def write(batch):
+        calls.append(len(batch))
+        raise ConnectionError('database unavailable')
+
+    queue = WriteBehindQueue(write, interval=0.05, max_pending=2)
+    queue.put('a', 1)
+    queue.put('b', 2)
+    time.sleep(0.5)
+
+    # Retries wait 0.05, 0.1 and 0.2 secs instead of spinning
+    assert 1 <= len(calls) <= 5
+    assert queue.stats()['pending'] == 2
+    assert queue.stats()['backoff'] >= 0.1
+
+
+def test_batch_stays_visible_while_written():
+    writing = threading.Event()
+    release = threading.Event()
+    written = []
+
+    def write(batch):
+        writing.set()
+        release.wait(1)
+        written.append(batch)
+
+    queue = WriteBehindQueue(write, interval=0.01)
+    queue.put('a', 1)
+    assert writing.wait(1)
+
+    assert queue.get('a') == 1
+    release.set()
+    queue.close()
+
+    assert written == [{'a': 1}]
+    assert queue.get('a') is None
+
+
+def test_close_writes_pending_values():
+    written = []
+    queue = WriteBehindQueue(written.append, interval=60)
+    queue.put('a', 1)
+    queue.put('a', 2)
+    queue.close()
+
+    assert written == [{'a': 2}]
+    assert queue.stats()['coalesced'] == 1